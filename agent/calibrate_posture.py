@@ -8,18 +8,39 @@ from __future__ import annotations
 
 import argparse
 import datetime as dt
-import statistics
+import os
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 import shutil
+
+# Bound OpenMP workers before MediaPipe/OpenCV spin up their pools so they do not
+# oversubscribe the cores Pose inference runs on.
+os.environ.setdefault("OMP_NUM_THREADS", "2")
+
 import cv2
 import mediapipe as mp
-import yaml
+import numpy as np
 from loguru import logger
 
-from agent.capture import CameraStream, ensure_camera_settings
-from agent.main import build_posture_service, ensure_no_proxy, load_settings
+from agent.capture import (
+    CameraStream,
+    downscale_frame,
+    ensure_camera_settings,
+    frame_delta,
+    ImageWriter,
+    motion_thumbnail,
+    resolve_stream_source,
+)
+from agent.main import (
+    apply_cv_threads,
+    build_posture_service,
+    ensure_no_proxy,
+    load_settings,
+    resolve_downscale_width,
+    resolve_opencl,
+    save_settings,
+)
 
 _DRAWING_UTILS = mp.solutions.drawing_utils
 _DRAWING_STYLES = mp.solutions.drawing_styles
@@ -56,6 +77,19 @@ def parse_args() -> argparse.Namespace:
         default=5.0,
         help="Extra margin added to avg neck_angle",
     )
+    parser.add_argument(
+        "--percentile",
+        type=float,
+        default=50.0,
+        help="Sample percentile used as the baseline before margins (50 = median)",
+    )
+    parser.add_argument(
+        "--static-threshold",
+        type=float,
+        default=0.0,
+        help="Mean grayscale difference to the last analyzed frame below which a "
+        "frame is skipped without pose detection or a sample (0 disables)",
+    )
     parser.add_argument(
         "--save-dir",
         type=Path,
@@ -78,6 +112,8 @@ def _collect_samples(
     posture_service,
     save_dir: Path,
     collect_angle: bool,
+    static_threshold: float = 0.0,
+    downscale_width: Optional[int] = None,
 ) -> tuple[List[float], List[float], Dict[str, int]]:
     drops: list[float] = []
     angles: list[float] = []
@@ -86,28 +122,54 @@ def _collect_samples(
         "valid": 0,
         "no_landmarks": 0,
         "filtered": 0,
+        "static": 0,
     }
+    last_analyzed: Dict[str, Any] = {"thumb": None}
 
     save_dir.mkdir(parents=True, exist_ok=True)
+    writer = ImageWriter()
 
     ensure_camera_settings(camera_url)
+    source, api_preference = resolve_stream_source(
+        camera_url, capture_cfg.get("pipeline")
+    )
     stream = CameraStream(
-        source=camera_url,
+        source=source,
+        api_preference=api_preference,
         target_fps=float(capture_cfg.get("target_fps", 15)),
         reconnect_delay=float(capture_cfg.get("reconnect_delay", 5)),
         max_retries=int(capture_cfg.get("max_retries", 3)),
         frame_saver=None,
+        convert_rgb=True,
+        use_opencl=resolve_opencl(capture_cfg),
     )
 
-    def _collect(frame: "Any") -> bool:
+    def _collect(frame: "Any", rgb: "Any") -> bool:
         stats["frames"] += 1
-        assessment, landmarks = posture_service.analyze_with_landmarks(frame)
+        # Pose landmarks are normalized, so inference runs on a smaller RGB copy
+        # while the full-resolution BGR frame is kept for the snapshot.
+        small = downscale_frame(rgb, downscale_width)
+        thumb = motion_thumbnail(small) if static_threshold > 0 else None
+        if (
+            thumb is not None
+            and frame_delta(thumb, last_analyzed["thumb"]) < static_threshold
+        ):
+            # Scene barely changed since the last Pose run: a copy of that result
+            # would only weight the baseline, so skip the frame altogether. The
+            # reference stays the analyzed frame so slow drift still triggers a run.
+            stats["static"] += 1
+            return len(drops) < target_samples
+        assessment, landmarks = posture_service.analyze_rgb_with_landmarks(small)
+        last_analyzed["thumb"] = thumb
         if assessment:
             stats["valid"] += 1
             drops.append(assessment.nose_drop)
             if collect_angle:
                 angles.append(assessment.neck_angle)
+            # Last use of `frame`: the snapshot annotates it in place and hands it
+            # to the writer thread, so it must not be read after this call.
             _save_snapshot(
+                writer,
                 frame,
                 landmarks,
                 save_dir,
@@ -135,6 +197,7 @@ def _collect_samples(
         stream.iterate(on_frame=_collect, max_frames=max_frames)
     finally:
         stream.release()
+        writer.close()
 
     return drops, angles, stats
 
@@ -148,6 +211,7 @@ def main() -> None:
     camera_url = settings.get("camera_url", "")
     ensure_no_proxy(camera_url)
     capture_cfg = settings.get("capture", {}) or {}
+    apply_cv_threads(capture_cfg, default=1)
     posture_cfg = settings.get("posture", {}) or {}
     calibrate_angle = posture_cfg.get("neck_angle") is not None
     # Fallback thresholds during calibration to avoid NoneType casting errors.
@@ -181,6 +245,8 @@ def main() -> None:
         posture_service,
         save_dir,
         collect_angle=calibrate_angle,
+        static_threshold=args.static_threshold,
+        downscale_width=resolve_downscale_width(capture_cfg),
     )
     posture_service.close()
 
@@ -191,18 +257,35 @@ def main() -> None:
 
     samples_ratio = stats["valid"] / stats["frames"] if stats["frames"] else 0.0
     logger.info(
-        "Calibration quality: {:.1f}% valid ({}/{}) frames, {} without landmarks, {} filtered",
+        "Calibration quality: {:.1f}% valid ({}/{}) frames, {} without landmarks, {} filtered, {} skipped as static",
         samples_ratio * 100,
         stats["valid"],
         stats["frames"],
         stats["no_landmarks"],
         stats["filtered"],
+        stats["static"],
     )
 
-    median_drop = statistics.median(drops)
-    new_drop = median_drop + args.nose_margin
-    median_angle = statistics.median(angles) if angles else None
-    new_angle = median_angle + args.angle_margin if median_angle is not None else None
+    drops_np = np.asarray(drops, dtype=np.float64)
+    base_drop = float(np.percentile(drops_np, args.percentile))
+    new_drop = base_drop + args.nose_margin
+    logger.info(
+        "nose_drop spread: p{:g}={:.4f} std={:.4f}",
+        args.percentile,
+        base_drop,
+        float(np.std(drops_np)),
+    )
+    base_angle: float | None = None
+    if angles:
+        angles_np = np.asarray(angles, dtype=np.float64)
+        base_angle = float(np.percentile(angles_np, args.percentile))
+        logger.info(
+            "neck_angle spread: p{:g}={:.2f} std={:.2f}",
+            args.percentile,
+            base_angle,
+            float(np.std(angles_np)),
+        )
+    new_angle = base_angle + args.angle_margin if base_angle is not None else None
 
     settings.setdefault("posture", {})
     settings["posture"]["nose_drop"] = round(new_drop, 4)
@@ -215,31 +298,32 @@ def main() -> None:
         "samples": len(drops),
         "nose_margin": args.nose_margin,
         "angle_margin": args.angle_margin if calibrate_angle else None,
-        "avg_drop": round(median_drop, 4),
-        "avg_angle": round(median_angle, 2) if median_angle is not None else None,
+        "percentile": args.percentile,
+        "avg_drop": round(base_drop, 4),
+        "avg_angle": round(base_angle, 2) if base_angle is not None else None,
     }
 
-    with (root / settings_path).open("w", encoding="utf-8") as handle:
-        yaml.safe_dump(settings, handle, sort_keys=False, allow_unicode=True)
+    save_settings(root / settings_path, settings)
 
     if new_angle is None:
         logger.info(
-            "Calibration complete. Updated nose_drop=%.4f (median_drop=%.4f); neck angle disabled",
+            "Calibration complete. Updated nose_drop={:.4f} (base_drop={:.4f}); neck angle disabled",
             new_drop,
-            median_drop,
+            base_drop,
         )
     else:
         logger.info(
-            "Calibration complete. Updated thresholds: nose_drop={:.4f} neck_angle={:.2f} (median_drop={:.4f} median_angle={:.2f})",
+            "Calibration complete. Updated thresholds: nose_drop={:.4f} neck_angle={:.2f} (base_drop={:.4f} base_angle={:.2f})",
             new_drop,
             new_angle,
-            median_drop,
-            median_angle,
+            base_drop,
+            base_angle,
         )
     logger.info("Settings saved to {}", (root / settings_path))
 
 
 def _save_snapshot(
+    writer: ImageWriter,
     frame: "Any",
     landmarks: Any,
     save_dir: Path,
@@ -247,7 +331,8 @@ def _save_snapshot(
     nose_drop: float,
     neck_angle: float,
 ) -> None:
-    annotated = frame.copy()
+    """Annotate ``frame`` in place and queue it for writing (takes ownership)."""
+    annotated = frame
     timestamp = dt.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     if landmarks is not None:
         _DRAWING_UTILS.draw_landmarks(
@@ -269,7 +354,7 @@ def _save_snapshot(
     )
     filename = f"calibration_{sample_idx:03d}.jpg"
     path = save_dir / filename
-    cv2.imwrite(str(path), annotated)
+    writer.submit(path, annotated, f"calibration sample {sample_idx}", copy=False)
 
 
 def _prepare_save_dir(save_dir: Path, clean: bool) -> None:
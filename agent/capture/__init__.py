@@ -2,18 +2,34 @@
 
 from .ingest import (
     CameraStream,
+    downscale_frame,
     ensure_camera_settings,
+    frame_delta,
     FrameSaveConfig,
     FrameSaver,
     IdentityCapture,
     IdentityCaptureConfig,
+    ImageWriter,
+    motion_thumbnail,
+    opencl_available,
+    resolve_stream_source,
+    to_rgb,
+    write_image,
 )
 
 __all__ = [
     "CameraStream",
+    "downscale_frame",
     "ensure_camera_settings",
+    "frame_delta",
     "FrameSaveConfig",
     "FrameSaver",
     "IdentityCapture",
     "IdentityCaptureConfig",
+    "ImageWriter",
+    "motion_thumbnail",
+    "opencl_available",
+    "resolve_stream_source",
+    "to_rgb",
+    "write_image",
 ]
@@ -3,19 +3,128 @@
 from __future__ import annotations
 
 import json
+import os
+import queue
+import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
-from datetime import datetime
 from pathlib import Path
-from typing import Callable, Optional, Set
+from typing import Callable, Optional, Set, Tuple
 from urllib.parse import urlparse
 from urllib.request import ProxyHandler, build_opener
 
 import cv2
 from loguru import logger
 
+try:
+    import simplejpeg
+except ImportError:  # pragma: no cover - optional dependency
+    simplejpeg = None
+
+# How long the consumer waits for a fresh frame before re-checking the reader.
+_FRAME_WAIT_SECONDS = 1.0
+# Progress log cadence instead of a per-frame debug line.
+_FRAME_LOG_EVERY = 300
+# Matches cv2.imwrite's default JPEG quality so both encoders produce similar files.
+_JPEG_QUALITY = 95
+_JPEG_EXTENSIONS = (".jpg", ".jpeg")
+# FFmpeg demuxer options for RTSP: TCP avoids UDP reordering/loss, and
+# nobuffer/low_delay stop it from holding frames back before grab() sees them.
+_FFMPEG_RTSP_OPTIONS = "rtsp_transport;tcp|fflags;nobuffer|flags;low_delay"
+
+
+def write_image(path: str | Path, frame: "cv2.Mat") -> bool:
+    """Encode a BGR frame to ``path``, preferring libjpeg-turbo via simplejpeg."""
+    path = os.fspath(path)
+    if simplejpeg is not None and path.lower().endswith(_JPEG_EXTENSIONS):
+        try:
+            data = simplejpeg.encode_jpeg(
+                frame, quality=_JPEG_QUALITY, colorspace="BGR"
+            )
+            with open(path, "wb") as handle:
+                handle.write(data)
+            return True
+        except Exception as exc:  # pragma: no cover - encoder/filesystem concerns
+            logger.debug("simplejpeg encode failed for {}, using OpenCV: {}", path, exc)
+    return bool(cv2.imwrite(path, frame))
+
+
+class ImageWriter:
+    """Encode and write frames on a small thread pool off the capture loop.
+
+    At most ``max_pending`` frames are queued or being written; further submits
+    are dropped so a stalled SD card cannot pile up full-frame copies in memory.
+    """
 
-@dataclass
+    def __init__(self, max_workers: int = 2, max_pending: int = 4) -> None:
+        self._max_workers = max_workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._ensured_dirs: Set[str] = set()
+        self._slots = threading.BoundedSemaphore(max(1, max_pending))
+        self._dropped = 0
+
+    def ensure_dir(self, target_dir: str) -> None:
+        """Create ``target_dir`` once; later calls skip the mkdir syscall."""
+        if target_dir not in self._ensured_dirs:
+            os.makedirs(target_dir, exist_ok=True)
+            self._ensured_dirs.add(target_dir)
+
+    def submit(
+        self,
+        path: str | Path,
+        frame: "cv2.Mat",
+        description: str,
+        copy: bool = True,
+    ) -> bool:
+        """Queue a frame for writing; pass ``copy=False`` if the caller drops it.
+
+        Returns False when the frame was dropped because too many writes are
+        pending. True only means the write was queued, not that it succeeded.
+        """
+        if not self._slots.acquire(blocking=False):
+            self._dropped += 1
+            if self._dropped == 1 or self._dropped % 100 == 0:
+                logger.warning(
+                    "Image writer backlog full; dropped {} image(s) so far",
+                    self._dropped,
+                )
+            return False
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self._max_workers, thread_name_prefix="image-writer"
+            )
+        try:
+            data = frame.copy() if copy else frame
+            future = self._pool.submit(write_image, path, data)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(
+            lambda done: self._report(done, path, description)
+        )
+        return True
+
+    def _report(self, future: Future, path: str | Path, description: str) -> None:
+        self._slots.release()
+        try:
+            saved = future.result()
+        except Exception as exc:  # pragma: no cover - encoder/filesystem concerns
+            logger.warning("Unable to save {} to {}: {}", description, path, exc)
+            return
+        if saved:
+            logger.info("Saved {} to {}", description, path)
+        else:
+            logger.warning("Unable to save {} to {}", description, path)
+
+    def close(self) -> None:
+        """Wait for pending writes; a later submit() starts a fresh pool."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+
+@dataclass(slots=True, frozen=True)
 class FrameSaveConfig:
     root: Path
     enabled: bool = False
@@ -33,34 +142,44 @@ class FrameSaver:
 
     def __init__(self, config: FrameSaveConfig) -> None:
         self._config = config
-        self._last_saved = 0.0
+        self._root_str = os.fspath(config.root)
+        self._next_save_at = 0.0
+        self._writer = ImageWriter()
+
+    @property
+    def enabled(self) -> bool:
+        return self._config.enabled
 
     def save(self, frame: "cv2.Mat", category: Optional[str] = None) -> Optional[Path]:
+        """Queue a snapshot and return its path, or None if none was queued.
+
+        The write happens in the background, so the file may not exist yet and
+        is missing altogether if the write later fails.
+        """
         if not self._config.enabled:
             return None
 
-        now = time.time()
-        if now - self._last_saved < self._config.interval_seconds:
+        now = time.monotonic()
+        if now < self._next_save_at:
             return None
+        self._next_save_at = now + self._config.interval_seconds
 
         category = category or self._config.default_category
         if category:
-            target_dir = self._config.root / category
+            target_dir = os.path.join(self._root_str, category)
         else:
-            target_dir = self._config.root
-        target_dir.mkdir(parents=True, exist_ok=True)
-        filename = datetime.now().strftime("%Y%m%d_%H%M%S_%f") + ".jpg"
-        path = target_dir / filename
-        if cv2.imwrite(str(path), frame):
-            self._last_saved = now
-            logger.info("Saved frame snapshot to {}", path)
-            return path
+            target_dir = self._root_str
+        self._writer.ensure_dir(target_dir)
+        path = os.path.join(target_dir, f"{time.time_ns()}.jpg")
+        if not self._writer.submit(path, frame, "frame snapshot"):
+            return None
+        return Path(path)
 
-        logger.warning("Unable to save frame to {}", path)
-        return None
+    def close(self) -> None:
+        self._writer.close()
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class IdentityCaptureConfig:
     root: Path
     enabled: bool = False
@@ -71,7 +190,7 @@ class IdentityCaptureConfig:
     def __post_init__(self) -> None:
         self.root.mkdir(parents=True, exist_ok=True)
         if not self.extension.startswith("."):
-            self.extension = f".{self.extension}"
+            object.__setattr__(self, "extension", f".{self.extension}")
 
 
 class IdentityCapture:
@@ -84,48 +203,63 @@ class IdentityCapture:
         identities: Optional[Set[str]] = None,
     ) -> None:
         self._config = config
-        self._groups = groups
-        self._identities = identities
+        groups = frozenset(groups or ())
+        # A group name also matches the bare identity, so exact identities and
+        # groups collapse into one membership test.
+        self._accept = frozenset(identities or ()) | groups
+        # "child" matches both the bare identity and any "child/<name>" below it.
+        self._group_prefixes = tuple(f"{group}/" for group in groups)
+        self._accept_all = not self._accept
+        self._root_str = os.fspath(config.root)
+        self._writer = ImageWriter()
+        self._date_dir_minute = -1
+        self._date_dir = ""
 
     def save(self, identity: str, frame: "cv2.Mat") -> Optional[Path]:
+        """Queue a snapshot and return its path, or None if none was queued.
+
+        As with FrameSaver.save, the returned file is written in the background
+        and is not guaranteed to exist.
+        """
         if not self._config.enabled or frame is None:
             return None
         identity = identity or "unknown"
         if not self._should_capture(identity):
             return None
 
-        now = datetime.now()
-        date_dir = now.strftime(self._config.date_folder_format)
-        time_part = now.strftime(self._config.time_format)
+        now = time.time()
+        local_now = time.localtime(now)
+        date_dir = self._date_folder(now, local_now)
+        time_part = time.strftime(self._config.time_format, local_now)
         identity_parts = [part.strip() for part in identity.split("/") if part.strip()]
         if not identity_parts:
             identity_parts = ["unknown"]
-        target_dir = self._config.root.joinpath(*identity_parts, date_dir)
-        target_dir.mkdir(parents=True, exist_ok=True)
+        target_dir = os.path.join(self._root_str, *identity_parts, date_dir)
+        self._writer.ensure_dir(target_dir)
         safe_identity = "_".join(identity_parts)
         filename = f"{safe_identity}_{time_part}{self._config.extension}"
-        path = target_dir / filename
-        if cv2.imwrite(str(path), frame):
-            logger.info("Saved snapshot for {} to {}", safe_identity, path)
-            return path
+        path = os.path.join(target_dir, filename)
+        if not self._writer.submit(path, frame, f"snapshot for {safe_identity}"):
+            return None
+        return Path(path)
 
-        logger.warning("Unable to save snapshot for {} at {}", safe_identity, path)
-        return None
+    def close(self) -> None:
+        self._writer.close()
+
+    def _date_folder(self, now: float, local_now: time.struct_time) -> str:
+        # The date folder only changes at midnight; refresh it once per minute.
+        minute = int(now // 60)
+        if minute != self._date_dir_minute:
+            self._date_dir = time.strftime(self._config.date_folder_format, local_now)
+            self._date_dir_minute = minute
+        return self._date_dir
 
     def _should_capture(self, identity: str) -> bool:
-        if not self._groups and not self._identities:
+        if self._accept_all:
             return True
 
         identity = identity or "unknown"
-        if self._identities and identity in self._identities:
-            return True
-
-        if self._groups:
-            group = identity.split("/", 1)[0]
-            if group in self._groups:
-                return True
-
-        return False
+        return identity in self._accept or identity.startswith(self._group_prefixes)
 
 
 def ensure_camera_settings(
@@ -219,6 +353,157 @@ def ensure_camera_settings(
         )
 
 
+def downscale_frame(frame: "cv2.Mat", width: Optional[int]) -> "cv2.Mat":
+    """Shrink a frame to ``width`` pixels wide, keeping its aspect ratio."""
+    if not width or frame is None:
+        return frame
+    height, current_width = frame.shape[:2]
+    if current_width <= width:
+        return frame
+    target_height = max(1, round(height * width / current_width))
+    return cv2.resize(frame, (width, target_height), interpolation=cv2.INTER_AREA)
+
+
+def opencl_available() -> bool:
+    """Whether this OpenCV build can dispatch T-API (UMat) calls to OpenCL."""
+    ocl = getattr(cv2, "ocl", None)
+    try:
+        return bool(ocl is not None and ocl.haveOpenCL())
+    except cv2.error:  # pragma: no cover - driver/runtime concerns
+        return False
+
+
+def to_rgb(frame: "cv2.Mat", use_opencl: bool = False) -> "cv2.Mat":
+    """Convert a BGR frame to RGB, optionally on the OpenCL device via UMat."""
+    if use_opencl:
+        return cv2.cvtColor(cv2.UMat(frame), cv2.COLOR_BGR2RGB).get()
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+
+def motion_thumbnail(frame: "cv2.Mat", size: Tuple[int, int] = (80, 60)) -> "cv2.Mat":
+    """Return a tiny grayscale copy of a frame for cheap frame differencing.
+
+    Works for BGR or RGB input; channel order only shifts the luma weights.
+    """
+    # Shrink before converting so no full-size grayscale scratch buffer is allocated.
+    small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+
+def frame_delta(current: "cv2.Mat", previous: Optional["cv2.Mat"]) -> float:
+    """Mean absolute difference between two thumbnails (inf when there is no previous)."""
+    if previous is None:
+        return float("inf")
+    return float(cv2.absdiff(current, previous).mean())
+
+
+def _gstreamer_available() -> bool:
+    for line in cv2.getBuildInformation().splitlines():
+        if line.strip().startswith("GStreamer:"):
+            return "YES" in line
+    return False
+
+
+def resolve_stream_source(
+    camera_url: str, pipeline: Optional[str] = None
+) -> Tuple[str, int]:
+    """Return (source, api_preference), using a GStreamer pipeline when usable.
+
+    ``pipeline`` may reference the camera URL as ``{url}`` so hardware decoders
+    (e.g. ``v4l2jpegdec`` / ``nvv4l2decoder``) can be slotted in from config.
+    """
+    if not pipeline:
+        return camera_url, cv2.CAP_ANY
+    if not _gstreamer_available():
+        logger.warning(
+            "capture.pipeline set but OpenCV was built without GStreamer; "
+            "falling back to {}",
+            camera_url,
+        )
+        return camera_url, cv2.CAP_ANY
+    return pipeline.format(url=camera_url), cv2.CAP_GSTREAMER
+
+
+class _CaptureThread(threading.Thread):
+    """Grab frames continuously and keep only the newest decoded one."""
+
+    def __init__(
+        self,
+        stream: "CameraStream",
+        frame_interval: float,
+        convert_rgb: bool,
+        use_opencl: bool = False,
+        should_continue: Optional[Callable[[], bool]] = None,
+        should_decode: Optional[Callable[[], bool]] = None,
+    ) -> None:
+        super().__init__(name="camera-capture", daemon=True)
+        self._stream = stream
+        self._frame_interval = frame_interval
+        self._convert_rgb = convert_rgb
+        self._use_opencl = use_opencl
+        self._should_continue = should_continue
+        self._should_decode = should_decode
+        self.frames: "queue.Queue[Tuple[cv2.Mat, Optional[cv2.Mat]]]" = queue.Queue(
+            maxsize=1
+        )
+        self.stop_event = threading.Event()
+        self.error: Optional[BaseException] = None
+
+    def run(self) -> None:
+        next_deadline = time.monotonic()
+        try:
+            while not self.stop_event.is_set():
+                if not self._stream._grab():
+                    continue
+                now = time.monotonic()
+                # Drop frames that arrive before the next slot without decoding them.
+                if self._frame_interval and now < next_deadline:
+                    continue
+                # Checked before decoding so a closed gate costs no retrieve().
+                if self._should_continue is not None and not self._should_continue():
+                    break
+                # Paused: keep the connection and drain packets, but skip decoding.
+                if self._should_decode is not None and not self._should_decode():
+                    continue
+                frame = self._stream._retrieve()
+                if frame is None:
+                    continue
+                rgb = None
+                if self._convert_rgb:
+                    # Convert here so it overlaps with inference on the previous frame.
+                    # Left writeable: dlib rejects read-only buffers, and PostureService
+                    # flips the flag itself around MediaPipe.
+                    rgb = to_rgb(frame, self._use_opencl)
+                self._publish((frame, rgb))
+                # Advance on a fixed grid so per-frame jitter does not accumulate;
+                # resync after stalls (e.g. reconnects) instead of bursting to catch up.
+                next_deadline += self._frame_interval
+                if next_deadline <= now:
+                    next_deadline = now + self._frame_interval
+        except Exception as exc:  # pragma: no cover - hardware/network concerns
+            self.error = exc
+        finally:
+            # This thread owns the capture while it runs: releasing it from another
+            # thread could race a blocking grab() or a reconnect in progress.
+            try:
+                self._stream._release_capture()
+            finally:
+                self.stop_event.set()
+
+    def _publish(self, item: Tuple["cv2.Mat", Optional["cv2.Mat"]]) -> None:
+        # Single-slot queue: replace a frame the consumer has not picked up yet.
+        try:
+            self.frames.get_nowait()
+        except queue.Empty:
+            pass
+        self.frames.put_nowait(item)
+
+    def stop(self, timeout: float) -> None:
+        self.stop_event.set()
+        if self.is_alive():
+            self.join(timeout=timeout)
+
+
 class CameraStream:
     """Maintain a connection to a video stream and deliver frames."""
 
@@ -229,13 +514,20 @@ class CameraStream:
         reconnect_delay: float = 5.0,
         max_retries: int = 3,
         frame_saver: Optional[FrameSaver] = None,
+        api_preference: int = cv2.CAP_ANY,
+        convert_rgb: bool = False,
+        use_opencl: bool = False,
     ) -> None:
         self._source = source
+        self._api_preference = api_preference
+        self._convert_rgb = convert_rgb
+        self._use_opencl = use_opencl
         self._target_fps = target_fps
         self._reconnect_delay = reconnect_delay
         self._max_retries = max_retries
         self._frame_saver = frame_saver
         self._capture: Optional[cv2.VideoCapture] = None
+        self._reader: Optional[_CaptureThread] = None
 
     def __enter__(self) -> CameraStream:
         self._open_capture()
@@ -248,7 +540,15 @@ class CameraStream:
         if self._capture is not None:
             self._capture.release()
 
-        self._capture = cv2.VideoCapture(self._source)
+        if self._source.lower().startswith(("rtsp://", "rtsps://")) and (
+            self._api_preference in (cv2.CAP_ANY, cv2.CAP_FFMPEG)
+        ):
+            # Read by the FFmpeg backend when the capture opens; an explicit
+            # value from the environment wins.
+            os.environ.setdefault("OPENCV_FFMPEG_CAPTURE_OPTIONS", _FFMPEG_RTSP_OPTIONS)
+        self._capture = cv2.VideoCapture(self._source, self._api_preference)
+        # Keep the backend queue shallow so grab() skips to the newest frame.
+        self._capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
         attempt = 0
         while not self._capture.isOpened():
             attempt += 1
@@ -260,22 +560,46 @@ class CameraStream:
                 "Stream not available, retrying in {}s", self._reconnect_delay
             )
             time.sleep(self._reconnect_delay)
-            self._capture.open(self._source)
+            self._capture.open(self._source, self._api_preference)
 
         logger.info("Connected to stream {}", self._source)
 
     def release(self) -> None:
+        reader, self._reader = self._reader, None
+        if reader is not None:
+            reader.stop(timeout=self._reconnect_delay + 1.0)
+        if self._frame_saver is not None:
+            self._frame_saver.close()
+        if reader is not None and reader.is_alive():
+            # Still stuck in grab() or reconnecting; the reader releases the
+            # capture itself once that returns.
+            logger.warning("Capture thread still busy; it will release the stream on exit")
+            return
+        self._release_capture()
+
+    def _release_capture(self) -> None:
         if self._capture is not None:
             self._capture.release()
             self._capture = None
 
-    def _read_raw_frame(self) -> Optional["cv2.Mat"]:
+    def _grab(self) -> bool:
+        """Advance the stream by one frame without decoding it."""
         if self._capture is None or not self._capture.isOpened():
             self._open_capture()
 
-        ret, frame = self._capture.read()
+        if self._capture.grab():
+            return True
+
+        logger.warning("Failed to read frame from stream, reconnecting after delay")
+        time.sleep(self._reconnect_delay)
+        self._open_capture()
+        return False
+
+    def _retrieve(self) -> Optional["cv2.Mat"]:
+        """Decode the most recently grabbed frame."""
+        ret, frame = self._capture.retrieve()
         if not ret or frame is None:
-            logger.warning("Failed to read frame from stream, reconnecting after delay")
+            logger.warning("Failed to decode frame from stream, reconnecting after delay")
             time.sleep(self._reconnect_delay)
             self._open_capture()
             return None
@@ -284,40 +608,63 @@ class CameraStream:
 
     def iterate(
         self,
-        on_frame: Optional[Callable[["cv2.Mat"], bool]] = None,
+        on_frame: Optional[Callable[..., bool]] = None,
         max_frames: Optional[int] = None,
+        should_continue: Optional[Callable[[], bool]] = None,
+        should_decode: Optional[Callable[[], bool]] = None,
     ) -> None:
-        """Start consuming the stream and handing frames to a callback."""
+        """Start consuming the stream and handing frames to a callback.
+
+        With ``convert_rgb`` the callback receives ``(frame, rgb)``, where ``rgb``
+        is an RGB copy prepared on the capture thread. ``should_continue`` is
+        polled before each frame is decoded; returning False ends the iteration.
+        ``should_decode`` returning False skips the frame but keeps the stream open.
+        """
 
         frames = 0
         frame_interval = (
             1.0 / self._target_fps if self._target_fps and self._target_fps > 0 else 0
         )
-        last_time = time.time()
+
+        frame_saver = (
+            self._frame_saver
+            if self._frame_saver is not None and self._frame_saver.enabled
+            else None
+        )
 
         with self:
+            self._reader = _CaptureThread(
+                self,
+                frame_interval,
+                self._convert_rgb,
+                self._use_opencl,
+                should_continue=should_continue,
+                should_decode=should_decode,
+            )
+            self._reader.start()
             while max_frames is None or frames < max_frames:
-                frame = self._read_raw_frame()
-                if frame is None:
+                try:
+                    frame, rgb = self._reader.frames.get(timeout=_FRAME_WAIT_SECONDS)
+                except queue.Empty:
+                    if self._reader.stop_event.is_set():
+                        if self._reader.error is not None:
+                            raise self._reader.error
+                        break
                     continue
 
                 frames += 1
-                logger.debug("Captured frame #{}", frames)
+                if frames % _FRAME_LOG_EVERY == 0:
+                    logger.debug("Captured {} frames", frames)
 
-                if self._frame_saver is not None:
-                    self._frame_saver.save(frame)
+                if frame_saver is not None:
+                    frame_saver.save(frame)
 
                 if on_frame:
-                    continue_loop = on_frame(frame)
+                    continue_loop = (
+                        on_frame(frame, rgb) if self._convert_rgb else on_frame(frame)
+                    )
                     if continue_loop is False:
                         logger.info("Frame callback requested shutdown")
                         break
 
-                now = time.time()
-                elapsed = now - last_time
-                delay = frame_interval - elapsed
-                if delay > 0:
-                    time.sleep(delay)
-                last_time = time.time()
-
         logger.info("Stream iteration ended after {} frames", frames)
@@ -2,50 +2,64 @@
 
 from __future__ import annotations
 
+import functools
+import json
 import os
+import signal
 import sys
 import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from urllib.parse import urlparse
 from pathlib import Path
-from typing import Any, Callable, Dict, Optional, Set, Tuple
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Set, Tuple
 import shutil
 
 import cv2
-import yaml
 from loguru import logger
 
+# settings.yaml is mirrored to a settings.json sidecar that is read instead while
+# the YAML's mtime and size match the ones recorded in it; set this to "0" to
+# always parse the YAML.
+SETTINGS_CACHE_ENV = "STUDYGUARDIAN_SETTINGS_CACHE"
+
 # Quiet TFLite / cpuinfo warnings unless user overrides.
 os.environ.setdefault("CPUINFO_LOG_LEVEL", "error")
 os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "1")
 
 from agent.capture import (
     CameraStream,
+    downscale_frame,
     ensure_camera_settings,
+    frame_delta,
     FrameSaveConfig,
     FrameSaver,
     IdentityCapture,
     IdentityCaptureConfig,
+    motion_thumbnail,
+    opencl_available,
+    resolve_stream_source,
+    to_rgb,
 )
-from agent.posture import PostureConfig, PostureService
-from agent.recognition import FaceMatch, FaceService
-from agent.storage import (
-    Storage,
-    StorageConfig,
-    FaceCaptureRetentionWorker,
-)
-from agent.sensors import (
-    Buzzer,
-    DHT22Sensor,
-    PIRSensor,
-    build_buzzer,
-    build_dht22_sensor,
-    build_pir_sensor,
-)
+from agent.posture import PostureAssessment, PostureConfig, PostureService
+
+# face_recognition/dlib, psycopg2 and the GPIO sensor stacks are only needed by
+# the full agent, so they are imported inside the builders/main(). Tools that
+# just reuse the settings/posture helpers (calibration, live posture test) skip them.
+if TYPE_CHECKING:
+    from agent.recognition import FaceMatch, FaceService
+    from agent.sensors import Buzzer, DHT22Sensor, PIRSensor
+    from agent.storage import FaceCaptureRetentionWorker, Storage
 
 
 class MotionGate:
-    """Gate frame processing based on PIR activity and face presence."""
+    """Gate frame processing based on PIR activity and face presence.
+
+    Invariants: ``_active`` is a ``threading.Event`` (lock-free ``is_set`` reads),
+    ``_last_face_ts`` is a float replaced by plain assignment, and ``_lock`` only
+    serializes the two multi-step transitions (``activate`` and the idle timeout)
+    so a PIR activation racing with a timeout is never lost.
+    """
 
     def __init__(
         self,
@@ -53,57 +67,170 @@ class MotionGate:
     ) -> None:
         self._idle_timeout = idle_timeout_seconds
         self._lock = threading.Lock()
-        self._active = False
+        self._active = threading.Event()
         self._last_face_ts = 0.0
 
     def activate(self) -> float:
         """Enable processing window and reset idle timer."""
         now = time.monotonic()
         with self._lock:
-            self._active = True
             self._last_face_ts = now  # start timeout countdown immediately
+            self._active.set()
             return now
 
-    def mark_face_seen(self) -> None:
-        with self._lock:
-            self._last_face_ts = time.monotonic()
+    def mark_face_seen(self, now: Optional[float] = None) -> None:
+        self._last_face_ts = time.monotonic() if now is None else now
 
     def deactivate(self) -> None:
+        self._active.clear()
+
+    def should_process(
+        self, now: Optional[float] = None
+    ) -> Tuple[bool, Optional[str]]:
+        """Return (active, reason_if_disabled); lock-free unless the window times out."""
+        if not self._active.is_set():
+            return False, None
+        if now is None:
+            now = time.monotonic()
+        last = self._last_face_ts
+        if last <= 0 or (now - last) <= self._idle_timeout:
+            return True, None
         with self._lock:
-            self._active = False
-
-    def should_process(self) -> Tuple[bool, Optional[str]]:
-        """Return (active, reason_if_disabled)."""
-        now = time.monotonic()
-        with self._lock:
-            if not self._active:
+            last = self._last_face_ts
+            if not self._active.is_set():
                 return False, None
-            if (
-                self._last_face_ts > 0
-                and (now - self._last_face_ts) > self._idle_timeout
-            ):
-                self._active = False
-                return False, f"no faces for {now - self._last_face_ts:.1f}s"
-            return True, None
+            if (now - last) <= self._idle_timeout:
+                return True, None
+            self._active.clear()
+            return False, f"no faces for {now - last:.1f}s"
+
+
+@functools.cache
+def _yaml_codec() -> Tuple[Any, Any, Any]:
+    """Import PyYAML (preferring the libyaml C loader/dumper) on first use.
+
+    Warm starts read the JSON sidecar, so they never import yaml at all.
+    """
+    import yaml
+
+    try:
+        from yaml import CSafeDumper as dumper, CSafeLoader as loader
+    except ImportError:  # pragma: no cover - PyYAML built without libyaml
+        from yaml import SafeDumper as dumper, SafeLoader as loader  # type: ignore[assignment]
+    return yaml, loader, dumper
 
 
 def load_settings(path: Path) -> Dict[str, Any]:
-    if not path.exists():
-        raise FileNotFoundError(f"Missing configuration at {path}")
+    try:
+        yaml_stat = path.stat()
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Missing configuration at {path}") from None
+
+    use_sidecar = os.environ.get(SETTINGS_CACHE_ENV) != "0"
+    sidecar_path = settings_sidecar_path(path)
+    if use_sidecar:
+        cached = _read_settings_sidecar(sidecar_path, yaml_stat)
+        if cached is not None:
+            return cached
+
+    # Hand libyaml raw bytes; it detects and decodes UTF-8 itself.
+    yaml, loader, _ = _yaml_codec()
+    with path.open("rb") as handle:
+        settings = yaml.load(handle, Loader=loader) or {}
+
+    if use_sidecar:
+        write_settings_sidecar(sidecar_path, settings, yaml_stat)
+    return settings
+
 
-    with path.open("r", encoding="utf-8") as handle:
-        return yaml.safe_load(handle) or {}
+def settings_sidecar_path(path: Path) -> Path:
+    """JSON mirror of a settings YAML file (``settings.yaml`` -> ``settings.json``)."""
+    return path.with_suffix(".json")
+
+
+def _sidecar_source_key(yaml_stat: os.stat_result) -> list[int]:
+    # Exact match rather than "sidecar newer than YAML": `cp -p`, `rsync -a` or a
+    # backup restore can bring back a YAML whose mtime predates the sidecar.
+    return [yaml_stat.st_mtime_ns, yaml_stat.st_size]
+
+
+def _read_settings_sidecar(
+    sidecar_path: Path, yaml_stat: os.stat_result
+) -> Optional[Dict[str, Any]]:
+    try:
+        payload = json.loads(sidecar_path.read_bytes())
+    except FileNotFoundError:
+        return None
+    except Exception as exc:
+        logger.debug("Ignoring unreadable settings sidecar {}: {}", sidecar_path, exc)
+        return None
+    if not isinstance(payload, dict):
+        return None
+    if payload.get("source") != _sidecar_source_key(yaml_stat):
+        return None
+    settings = payload.get("settings")
+    return settings if isinstance(settings, dict) else None
+
+
+def write_settings_sidecar(
+    sidecar_path: Path, settings: Dict[str, Any], yaml_stat: os.stat_result
+) -> bool:
+    """Write ``settings`` as JSON next to the YAML; skipped if JSON would alter it.
+
+    ``yaml_stat`` is the stat of the YAML the settings were read from (or just
+    written to); the sidecar is only used while that file still matches it.
+    """
+    try:
+        payload = json.dumps(
+            {"source": _sidecar_source_key(yaml_stat), "settings": settings},
+            ensure_ascii=False,
+        )
+        # YAML-only types (dates, non-string keys) would not survive the round trip.
+        if json.loads(payload)["settings"] != settings:
+            logger.debug("Settings not JSON round-trippable; skipping {}", sidecar_path)
+            return False
+        tmp_path = sidecar_path.with_name(sidecar_path.name + ".tmp")
+        # The sidecar carries the same secrets as the YAML (auth, DSN password),
+        # so it gets the YAML's permission bits rather than the umask default.
+        mode = yaml_stat.st_mode & 0o777
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            os.fchmod(handle.fileno(), mode)
+            handle.write(payload)
+        os.replace(tmp_path, sidecar_path)
+    except Exception as exc:
+        logger.debug("Unable to write settings sidecar {}: {}", sidecar_path, exc)
+        return False
+    return True
+
+
+def save_settings(path: Path, settings: Dict[str, Any]) -> None:
+    yaml, _, dumper = _yaml_codec()
+    with path.open("w", encoding="utf-8") as handle:
+        yaml.dump(
+            settings,
+            handle,
+            Dumper=dumper,
+            sort_keys=False,
+            allow_unicode=True,
+        )
+    # Refresh the sidecar now so the next start (e.g. right after calibration)
+    # does not have to fall back to parsing the YAML it just wrote.
+    if os.environ.get(SETTINGS_CACHE_ENV) != "0":
+        write_settings_sidecar(settings_sidecar_path(path), settings, path.stat())
 
 
 def configure_logger(root: Path, config: Dict[str, Any]) -> None:
     logger.remove()
     log_level = config.get("level", "INFO").upper()
     stderr = sys.stderr
-    logger.add(stderr, level=log_level)
+    # enqueue=True hands records to loguru's background writer, so formatting
+    # output, file writes and rotation checks stay off the frame thread.
+    logger.add(stderr, level=log_level, enqueue=True)
 
     log_file = root / "logs" / "agent.log"
     log_file.parent.mkdir(parents=True, exist_ok=True)
-    logger.add(str(log_file), rotation="10 MB", level=log_level)
+    logger.add(str(log_file), rotation="10 MB", level=log_level, enqueue=True)
 
 
 def build_frame_saver(root: Path, config: Dict[str, Any]) -> Optional[FrameSaver]:
@@ -180,6 +307,8 @@ def build_identity_capture(
 
 
 def build_face_service(root: Path, config: Dict[str, Any]) -> FaceService:
+    from agent.recognition import FaceService
+
     known_dir = Path(config.get("known_dir", "data/known"))
     tolerance = float(config.get("tolerance", 0.55))
     location_model = config.get("location_model", "hog")
@@ -194,6 +323,10 @@ def build_face_service(root: Path, config: Dict[str, Any]) -> FaceService:
         tolerance=tolerance,
         location_model=location_model,
         min_face_area_ratio=min_face_area_ratio,
+        detection_scale=float(config.get("detection_scale", 1.0)),
+        upsample=int(config.get("upsample", 1)),
+        use_cache=bool(config.get("encoding_cache", True)),
+        encode_workers=_optional_int(config.get("encode_workers")),
     )
     return service
 
@@ -207,11 +340,46 @@ def build_posture_service(config: Dict[str, Any]) -> PostureService:
         nose_drop=float(config.get("nose_drop")),
         neck_angle=neck_angle,
         visibility_threshold=visibility_threshold,
+        min_detection_confidence=float(config.get("min_detection_confidence", 0.4)),
+        min_tracking_confidence=float(config.get("min_tracking_confidence", 0.4)),
+        model_complexity=int(config.get("model_complexity", 1)),
+        static_image_mode=bool(config.get("static_image_mode", False)),
     )
     return PostureService(posture_config)
 
 
+def apply_cv_threads(capture_cfg: Dict[str, Any], default: Optional[int] = None) -> None:
+    """Cap OpenCV's worker threads (capture.cv_threads) to leave cores for MediaPipe."""
+    threads_raw = capture_cfg.get("cv_threads", default)
+    if threads_raw is None:
+        return
+    threads = int(threads_raw)
+    cv2.setNumThreads(threads)
+    logger.debug("OpenCV threads set to {}", threads)
+
+
+def resolve_opencl(capture_cfg: Dict[str, Any]) -> bool:
+    """Enable OpenCV's OpenCL (T-API) path when capture.opencl is set and usable."""
+    if not capture_cfg.get("opencl", False):
+        return False
+    if not opencl_available():
+        logger.warning("capture.opencl requested but OpenCL is unavailable; using CPU")
+        return False
+    cv2.ocl.setUseOpenCL(True)
+    logger.info("OpenCL enabled for frame preprocessing")
+    return True
+
+
+def resolve_downscale_width(capture_cfg: Dict[str, Any]) -> Optional[int]:
+    """Return the frame width used for posture inference (None keeps full size)."""
+    width_raw = capture_cfg.get("downscale_width")
+    width = int(width_raw) if width_raw is not None else 0
+    return width if width > 0 else None
+
+
 def build_storage(config: Dict[str, Any]) -> Storage:
+    from agent.storage import Storage, StorageConfig
+
     postgres_dsn = config.get("postgres_dsn")
     if not postgres_dsn:
         raise ValueError("PostgreSQL DSN must be provided under storage.postgres_dsn")
@@ -220,10 +388,23 @@ def build_storage(config: Dict[str, Any]) -> Storage:
         posture_table=config.get("table_name", "posture_events"),
         face_table=config.get("face_table_name", "face_captures"),
         reset_on_start=bool(config.get("reset_on_start", False)),
+        batch_size=int(config.get("batch_size", 100)),
+        flush_interval_seconds=float(config.get("flush_interval_seconds", 1.0)),
+        queue_size=int(config.get("queue_size", 1024)),
+        pool_size=int(config.get("pool_size", 2)),
+        synchronous_commit=bool(config.get("synchronous_commit", False)),
     )
     return Storage(storage_config)
 
 
+def _optional_float(value: Any) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+def _optional_int(value: Any) -> Optional[int]:
+    return int(value) if value is not None else None
+
+
 def _ensure_string_set(values: Any) -> Optional[Set[str]]:
     if values is None:
         return None
@@ -243,12 +424,46 @@ def _merge_sets(
     return set(primary).union(secondary)
 
 
+@functools.lru_cache(maxsize=256)
+def _identity_group(identity: str) -> str:
+    """Group prefix of an identity label (``child/alice`` -> ``child``).
+
+    Labels come from the small, fixed set of known faces, so the lookup is memoized.
+    """
+    return identity.partition("/")[0] or "unknown"
+
+
+def gate_predicate(motion_gate: MotionGate) -> Callable[[], bool]:
+    """Adapt MotionGate.should_process for CameraStream.iterate(should_continue=...)."""
+
+    def _should_continue() -> bool:
+        active, reason = motion_gate.should_process()
+        if not active and reason:
+            logger.info("Stopping capture; {}", reason)
+        return active
+
+    return _should_continue
+
+
+def _log_level_enabled(level: str) -> bool:
+    """Whether any configured loguru sink accepts ``level``."""
+    min_level = getattr(getattr(logger, "_core", None), "min_level", 0)
+    return logger.level(level).no >= min_level
+
+
 def _derive_allowed_groups(settings: Dict[str, Any]) -> Optional[Set[str]]:
     """Use face_capture groups to decide whose posture to check."""
     capture_cfg = settings.get("face_capture") or {}
     return _ensure_string_set(capture_cfg.get("groups"))
 
 
+# Consecutive still frames that may reuse one posture assessment.
+_MAX_STILL_POSTURE_REUSE = 15
+# Consecutive frames that may reuse one face recognition result while the scene
+# is still, so a wrong or stale identity is eventually re-checked.
+_MAX_STILL_FACE_REUSE = 15
+
+
 def make_frame_handler(
     face_service: FaceService,
     posture_service: PostureService,
@@ -261,131 +476,338 @@ def make_frame_handler(
     buzzer_beep_count: int = 2,
     buzzer_beep_interval: float = 0.4,
     buzzer_min_gap_seconds: float = 5.0,
-) -> Callable[[cv2.Mat], bool]:
+    posture_downscale_width: Optional[int] = None,
+    motion_delta: Optional[float] = None,
+    recognition_batch_size: int = 1,
+    recognition_batch_window: float = 0.2,
+    face_stride: int = 1,
+    posture_stride: int = 1,
+    posture_executor: Optional[ThreadPoolExecutor] = None,
+    pose_guided_faces: bool = False,
+    reuse_posture_when_still: bool = False,
+    posture_log_interval: float = 0.0,
+) -> Callable[..., bool]:
     last_beep_ts = 0.0
     last_allowed_seen_ts = 0.0
     last_allowed_identity = "unknown"
+    prev_thumb: Optional["cv2.Mat"] = None
+    last_matches: list[FaceMatch] = []
+    pending: list[Tuple["cv2.Mat", Optional["cv2.Mat"]]] = []
+    pending_since = 0.0
+    face_tick = 0
+    face_reuses = 0
+    last_posture: Optional[PostureAssessment] = None
+    posture_reuses = 0
+    posture_tick = 0
+    last_logged_state: Optional[Tuple[str, bool]] = None
+    last_posture_log_ts = 0.0
+    face_stride = max(1, int(face_stride))
+    posture_stride = max(1, int(posture_stride))
+    allowed = frozenset(allowed_groups) if allowed_groups else None
+    # Groups of all known labels are resolved when faces load; the memoized split
+    # only covers identities outside that table.
+    known_groups = face_service.identity_groups
+    # Sinks are configured before the handler is built; checking levels once here
+    # keeps filtered-out per-frame log calls from formatting their messages.
+    debug_on = _log_level_enabled("DEBUG")
+    info_on = _log_level_enabled("INFO")
+
+    def _is_still(frame: "cv2.Mat") -> bool:
+        nonlocal prev_thumb
+        if not motion_delta:
+            return False
+        thumb = motion_thumbnail(frame)
+        still = frame_delta(thumb, prev_thumb) < motion_delta
+        prev_thumb = thumb
+        return still
+
+    def _analyze_posture(
+        frame: "cv2.Mat", rgb: Optional["cv2.Mat"], private: bool = False
+    ) -> Optional[PostureAssessment]:
+        # Still frames may arrive without an RGB copy; converting after the
+        # downscale (inside analyze) is cheaper than a full-size conversion.
+        if rgb is None:
+            return posture_service.analyze(downscale_frame(frame, posture_downscale_width))
+        small = downscale_frame(rgb, posture_downscale_width)
+        if private and small is rgb:
+            # Pose marks its input read-only while it runs; dlib may be reading
+            # the shared array concurrently and rejects read-only buffers.
+            small = rgb.copy()
+        return posture_service.analyze_rgb(small)
+
+    def _recognize_after_pose(
+        frame: "cv2.Mat", rgb: "cv2.Mat"
+    ) -> Tuple[list[FaceMatch], Future]:
+        # Pose runs first; its head box limits the face detector to a small crop,
+        # and a frame without a body is taken to have no face either.
+        small = downscale_frame(rgb, posture_downscale_width)
+        assessment, landmarks = posture_service.analyze_rgb_with_landmarks(small)
+        height, width = rgb.shape[:2]
+        region = posture_service.head_region(landmarks, width, height)
+        matches = face_service.recognize_rgb_region(rgb, region) if region else []
+        done: Future = Future()
+        done.set_result(assessment)
+        return matches, done
+
+    def _reuse_faces(frame: "cv2.Mat") -> Tuple[bool, bool]:
+        """Return (reuse last matches, scene is still)."""
+        # Identities change slowly: only every face_stride-th frame (and only if
+        # the scene moved) reruns recognition; the rest reuse the last matches.
+        # Stillness is checked every frame so the reference thumbnail stays fresh.
+        # Still-scene reuse is capped like posture reuse (_MAX_STILL_FACE_REUSE).
+        nonlocal face_tick
+        nonlocal face_reuses
+        skip = face_tick % face_stride != 0
+        face_tick += 1
+        still = _is_still(frame)
+        reuse = skip or (still and face_reuses < _MAX_STILL_FACE_REUSE)
+        face_reuses = face_reuses + 1 if reuse else 0
+        return reuse, still
+
+    def handler(frame: "cv2.Mat", rgb: Optional["cv2.Mat"] = None) -> bool:
+        nonlocal last_matches
+        nonlocal pending_since
+        # The gate itself is polled by CameraStream (see gate_predicate) before
+        # frames are decoded; the handler only reports faces back to it.
+        if recognition_batch_size <= 1:
+            # Still scene: reuse the previous recognition instead of rerunning the
+            # face detector; snapshots/face rows are only written for fresh detections.
+            reused_matches, still = _reuse_faces(frame)
+            if not reused_matches:
+                # One RGB copy (normally made on the capture thread) feeds both face
+                # recognition and posture; without it, convert once here.
+                if rgb is None:
+                    rgb = to_rgb(frame)
+                posture_future: Optional[Future] = None
+                if pose_guided_faces:
+                    last_matches, posture_future = _recognize_after_pose(frame, rgb)
+                    return _process(
+                        frame, rgb, last_matches, reused_matches, posture_future
+                    )
+                if posture_executor is not None and posture_tick % posture_stride == 0:
+                    # Speculatively overlap Pose with face recognition; both
+                    # release the GIL in their native code.
+                    posture_future = posture_executor.submit(
+                        _analyze_posture, frame, rgb, True
+                    )
+                last_matches = face_service.recognize_rgb(rgb)
+                return _process(
+                    frame, rgb, last_matches, reused_matches, posture_future
+                )
+            return _process(frame, rgb, last_matches, reused_matches, still=still)
 
-    def handler(frame: "cv2.Mat") -> bool:
+        # Buffer frames so the CNN detector runs once per batch; downstream
+        # handling is replayed in capture order once the batch is recognized.
+        now = time.monotonic()
+        if not pending:
+            pending_since = now
+        pending.append((frame, rgb))
+        if (
+            len(pending) < recognition_batch_size
+            and (now - pending_since) < recognition_batch_window
+        ):
+            return True
+
+        _flush_pending()
+        return True
+
+    def _flush_pending() -> None:
+        """Recognize and handle any buffered frames (also called when the stream ends)."""
+        nonlocal last_matches
+        if not pending:
+            return
+        batch = pending[:]
+        pending.clear()
+        flags = [_reuse_faces(item[0]) for item in batch]
+        for index, (batch_frame, batch_rgb) in enumerate(batch):
+            if batch_rgb is None and not flags[index][0]:
+                batch[index] = (batch_frame, to_rgb(batch_frame))
+        fresh = face_service.recognize_batch_rgb(
+            [item[1] for item, (reuse, _) in zip(batch, flags) if not reuse]
+        )
+        fresh_iter = iter(fresh)
+        for (batch_frame, batch_rgb), (reuse, still) in zip(batch, flags):
+            if not reuse:
+                last_matches = next(fresh_iter)
+            _process(batch_frame, batch_rgb, last_matches, reuse, still=still)
+
+    def _process(
+        frame: "cv2.Mat",
+        rgb: Optional["cv2.Mat"],
+        matches: list[FaceMatch],
+        reused_matches: bool,
+        posture_future: Optional[Future] = None,
+        still: bool = False,
+    ) -> bool:
         nonlocal last_beep_ts
+        nonlocal last_posture
+        nonlocal posture_reuses
+        nonlocal posture_tick
+        nonlocal last_logged_state
+        nonlocal last_posture_log_ts
         nonlocal last_allowed_seen_ts
         nonlocal last_allowed_identity
-        if motion_gate is not None:
-            active, reason = motion_gate.should_process()
-            if not active:
-                if reason:
-                    logger.info("Stopping capture; {}", reason)
-                return False
-
-        matches: list[FaceMatch] = face_service.recognize(frame)
         had_faces = bool(matches)
         identity = "unknown"
         distance: Optional[float] = None
-        capture_records: dict[str, Tuple[str | None, Optional[str]]] = {}
+        # Posture reuses the face row of either the primary match or, when it
+        # falls back to last_allowed_identity, the allowed match seen this frame.
+        primary_record: Optional[Tuple[Optional[str], Optional[Path]]] = None
+        allowed_record: Optional[Tuple[Optional[str], Optional[Path]]] = None
+        # One timestamp per frame for the gate, the allowed window and the buzzer gap.
         now = time.monotonic()
         if had_faces:
-            for match in matches:
+            # Snapshots are per identity and frame: two faces labelled alike (e.g.
+            # two unknowns) share one file instead of encoding it twice. The paths
+            # are recorded when the write is queued, so a row's frame_path can name
+            # a file whose background write later failed (logged by ImageWriter).
+            saved_paths: Dict[str, Optional[Path]] = {}
+            for index, match in enumerate(matches):
                 identity_key = match.identity or "unknown"
-                group = (
-                    identity_key.split("/", 1)[0]
-                    if "/" in identity_key
-                    else identity_key or "unknown"
-                )
-                snapshot_path: Optional[str] = None
-                if identity_capture is not None:
-                    saved = identity_capture.save(identity_key, frame)
-                    if saved:
-                        snapshot_path = str(saved)
-                face_capture_id = storage.log_face_capture(
-                    identity=identity_key,
-                    group_tag=group or "unknown",
-                    face_distance=match.distance,
-                    frame_path=snapshot_path,
-                )
-                capture_records[identity_key] = (face_capture_id, snapshot_path)
+                group = known_groups.get(identity_key) or _identity_group(identity_key)
+                record = None
+                if not reused_matches:
+                    saved: Optional[Path] = None
+                    if identity_capture is not None:
+                        if identity_key in saved_paths:
+                            saved = saved_paths[identity_key]
+                        else:
+                            saved = identity_capture.save(identity_key, frame)
+                            saved_paths[identity_key] = saved
+                    face_capture_id = storage.log_face_capture(
+                        identity=identity_key,
+                        group_tag=group,
+                        face_distance=match.distance,
+                        frame_path=os.fspath(saved) if saved else None,
+                    )
+                    record = (face_capture_id, saved)
+                    if index == 0:
+                        primary_record = record
 
-                if allowed_groups and group in allowed_groups:
+                if allowed is not None and group in allowed:
                     last_allowed_seen_ts = now
                     last_allowed_identity = identity_key
+                    allowed_record = record
 
             primary = matches[0]
             identity = primary.identity
             distance = primary.distance
-            if identity == "unknown":
-                logger.info("Unknown person detected (dist {:.2f})", distance)
-            else:
-                logger.info("Recognized {} (dist {:.2f})", identity, distance)
+            if info_on:
+                if identity == "unknown":
+                    logger.info("Unknown person detected (dist {:.2f})", distance)
+                else:
+                    logger.info("Recognized {} (dist {:.2f})", identity, distance)
             if motion_gate is not None:
-                motion_gate.mark_face_seen()
-        else:
+                motion_gate.mark_face_seen(now)
+        elif debug_on:
             logger.debug("No faces detected in current frame")
 
         allowed_window_active = False
-        if allowed_groups:
+        if allowed is not None:
             identity_group = None
             if identity not in ("", "unknown"):
-                identity_group = identity.split("/", 1)[0]
+                identity_group = known_groups.get(identity) or _identity_group(
+                    identity
+                )
             allowed_window_active = (
                 last_allowed_seen_ts > 0
                 and (now - last_allowed_seen_ts) <= allowed_group_grace_seconds
             )
-            current_allowed = identity_group in allowed_groups if identity_group else False
+            current_allowed = identity_group in allowed if identity_group else False
             if current_allowed:
                 last_allowed_seen_ts = now
                 last_allowed_identity = identity or last_allowed_identity
                 allowed_window_active = True  # current frame is allowed, keep window active
             if not current_allowed and not allowed_window_active:
-                logger.debug(
-                    "Skipping posture analysis for {}; group %s not allowed",
-                    identity,
-                    identity_group or "unknown",
-                )
+                if debug_on:
+                    logger.debug(
+                        "Skipping posture analysis for {}; group {} not allowed",
+                        identity,
+                        identity_group or "unknown",
+                    )
+                if posture_future is not None:
+                    # Settle the speculative Pose run before the next frame can
+                    # reach the (non thread-safe) Pose graph.
+                    posture_future.exception()
                 return True
 
         # If in allowed window but current frame has no faces/unknown, reuse last allowed identity.
-        if allowed_groups and allowed_window_active and identity in ("", "unknown"):
+        if allowed is not None and allowed_window_active and identity in ("", "unknown"):
             identity = last_allowed_identity or "unknown"
 
         # Without allowed_groups, analyze everyone. With allowed_groups, analyze if current group is allowed or window is active.
 
-        posture = posture_service.analyze(frame)
+        # Posture drifts over seconds, so Pose only runs on every posture_stride-th
+        # eligible frame; skipped frames log no posture row.
+        skip_posture = posture_tick % posture_stride != 0
+        posture_tick += 1
+        if skip_posture:
+            return True
+
+        if posture_future is not None:
+            posture = posture_future.result()
+        elif (
+            reuse_posture_when_still
+            and still
+            and last_posture is not None
+            and posture_reuses < _MAX_STILL_POSTURE_REUSE
+        ):
+            # Nothing moved since the last assessment; Pose would see the same body.
+            # Capped so a slow slouch spread over many still frames is still caught.
+            posture = last_posture
+            posture_reuses += 1
+        else:
+            posture = _analyze_posture(frame, rgb)
+            posture_reuses = 0
+        last_posture = posture
         if posture:
             if posture.bad:
                 logger.warning(
-                    "Bad posture (%.3f drop / %.1f°) detected for %s: %s",
+                    "Bad posture ({:.3f} drop / {:.1f}°) detected for {}: {}",
                     posture.nose_drop,
                     posture.neck_angle,
                     identity,
                     ", ".join(posture.reasons),
                 )
-            else:
+            elif info_on:
                 logger.info(
                     "Posture looks good ({:.3f} drop / {:.1f}°) for {}",
                     posture.nose_drop,
                     posture.neck_angle,
                     identity,
                 )
-            face_capture_id: Optional[int] = None
-            capture_path: Optional[str] = None
-            record = capture_records.get(identity)
-            if record:
-                face_capture_id, capture_path = record
-            elif identity_capture is not None:
-                saved = identity_capture.save(identity, frame)
-                if saved:
-                    capture_path = str(saved)
-            storage.log_posture(
-                identity=identity,
-                is_bad=posture.bad,
-                nose_drop=posture.nose_drop,
-                neck_angle=posture.neck_angle,
-                reasons=posture.reasons,
-                face_distance=distance,
-                frame_path=capture_path,
-                face_capture_id=face_capture_id,
-            )
+            # Consecutive assessments mostly repeat the same state; a row is
+            # written when identity or good/bad changes, else at most once per
+            # posture_log_interval as a heartbeat.
+            state = (identity, posture.bad)
+            if (
+                state != last_logged_state
+                or now - last_posture_log_ts >= posture_log_interval
+            ):
+                last_logged_state = state
+                last_posture_log_ts = now
+                face_capture_id: Optional[str] = None
+                capture_path: Optional[Path] = None
+                record = None
+                if had_faces and identity == (matches[0].identity or "unknown"):
+                    record = primary_record
+                elif identity == last_allowed_identity:
+                    record = allowed_record
+                if record:
+                    face_capture_id, capture_path = record
+                elif identity_capture is not None:
+                    capture_path = identity_capture.save(identity, frame)
+                storage.log_posture(
+                    identity=identity,
+                    is_bad=posture.bad,
+                    nose_drop=posture.nose_drop,
+                    neck_angle=posture.neck_angle,
+                    reasons=posture.reasons,
+                    face_distance=distance,
+                    frame_path=os.fspath(capture_path) if capture_path else None,
+                    face_capture_id=face_capture_id,
+                )
             if posture.bad and buzzer is not None:
-                now = time.monotonic()
                 if (now - last_beep_ts) >= buzzer_min_gap_seconds:
                     try:
                         buzzer.beep_times(buzzer_beep_count, interval=buzzer_beep_interval)
@@ -393,11 +815,14 @@ def make_frame_handler(
                         logger.warning("Buzzer failed to beep: {}", exc)
                     finally:
                         last_beep_ts = now
-        else:
+        elif debug_on:
             logger.debug("Posture not available for {}", identity)
 
         return True
 
+    # Frames still buffered for a recognition batch when the stream ends would
+    # otherwise be dropped; callers run handler.flush() after iterate() returns.
+    handler.flush = _flush_pending  # type: ignore[attr-defined]
     return handler
 
 
@@ -406,6 +831,15 @@ def _merge_hosts(existing: str) -> set[str]:
 
 
 def ensure_no_proxy(camera_url: str | None) -> None:
+    existing = (os.environ.get("no_proxy", ""), os.environ.get("NO_PROXY", ""))
+    value = _compute_no_proxy(camera_url or "", existing)
+    for key in ("no_proxy", "NO_PROXY"):
+        if os.environ.get(key) != value:
+            os.environ[key] = value
+
+
+@functools.cache
+def _compute_no_proxy(camera_url: str, existing: Tuple[str, str]) -> str:
     hosts: set[str] = {"127.0.0.1", "localhost"}
     entries: set[str] = set()
     if camera_url:
@@ -415,15 +849,14 @@ def ensure_no_proxy(camera_url: str | None) -> None:
             if parsed.port:
                 entries.add(f"{parsed.hostname}:{parsed.port}")
 
-    for key in ("no_proxy", "NO_PROXY"):
-        existing = os.environ.get(key)
-        if existing:
-            entries.update(_merge_hosts(existing))
+    for current in existing:
+        if current:
+            entries.update(_merge_hosts(current))
 
     entries.update(hosts)
-    value = ",".join(sorted(entries))
-    os.environ["no_proxy"] = value
-    os.environ["NO_PROXY"] = value
+    # Sorted so the value is stable across runs and ensure_no_proxy can skip the
+    # putenv() when a parent process already exported it.
+    return ",".join(sorted(entries))
 
 
 def calibrate_posture(
@@ -462,11 +895,18 @@ class EnvLogger:
         self._retention_days = (
             float(retention_days) if retention_days and retention_days > 0 else None
         )
+        # Retention only needs to keep up with the window, not every reading.
+        self._prune_interval = (
+            max(60.0, self._retention_days * 86400 / 24) if self._retention_days else None
+        )
+        self._last_prune_ts = 0.0
         self._ensure_table()
 
     def _ensure_table(self) -> None:
-        cursor = self._conn.cursor()
-        cursor.execute(
+        # One cursor for the logger's lifetime; the statements below are prepared
+        # once per session so each reading skips parse/plan.
+        self._cursor = self._conn.cursor()
+        self._cursor.execute(
             f"""
             CREATE TABLE IF NOT EXISTS {self._table} (
               id BIGSERIAL PRIMARY KEY,
@@ -476,32 +916,45 @@ class EnvLogger:
             );
             """
         )
-        cursor.close()
+        self._cursor.execute(
+            "PREPARE env_ins (double precision, double precision) AS "
+            f"INSERT INTO {self._table} (humidity, temperature) VALUES ($1, $2)"
+        )
+        self._cursor.execute(
+            "PREPARE env_del (double precision) AS "
+            f"DELETE FROM {self._table} "
+            "WHERE timestamp < (NOW() - make_interval(secs => $1 * 86400))"
+        )
         self._conn.commit()
 
     def log(self, humidity: float, temperature: float) -> None:
-        cursor = self._conn.cursor()
-        cursor.execute(
-            f"INSERT INTO {self._table} (humidity, temperature) VALUES (%s, %s)",
-            (humidity, temperature),
-        )
-        if self._retention_days:
-            cursor.execute(
-                f"DELETE FROM {self._table} "
-                "WHERE timestamp < (NOW() - (%s || ' days')::interval)",
-                (self._retention_days,),
-            )
-        cursor.close()
-        self._conn.commit()
+        try:
+            self._cursor.execute("EXECUTE env_ins (%s, %s)", (humidity, temperature))
+            now = time.monotonic()
+            if self._prune_interval is not None and (
+                not self._last_prune_ts
+                or now - self._last_prune_ts >= self._prune_interval
+            ):
+                self._cursor.execute("EXECUTE env_del (%s)", (self._retention_days,))
+                self._last_prune_ts = now
+            self._conn.commit()
+        except Exception:
+            # Keep the session usable (prepared statements survive a rollback).
+            self._conn.rollback()
+            raise
 
     def close(self) -> None:
         try:
+            self._cursor.close()
             self._conn.close()
         except Exception:
             pass
 
 
 def main() -> None:
+    from agent.sensors import build_buzzer, build_dht22_sensor, build_pir_sensor
+    from agent.storage import FaceCaptureRetentionWorker
+
     root = Path(__file__).resolve().parents[1]
     settings_path = root / "config" / "settings.yaml"
     settings = load_settings(settings_path)
@@ -547,6 +1000,8 @@ def main() -> None:
         )
 
     def _poll_dht() -> None:
+        # Readings stay on a fixed grid; slow sensor reads or DB writes do not drift it.
+        next_read = time.monotonic()
         while not dht_stop_event.is_set():
             if dht_sensor is None:
                 break
@@ -562,7 +1017,11 @@ def main() -> None:
                         env_logger.log(humidity, temperature)
                     except Exception as exc:
                         logger.debug("DHT22 DB log failed: {}", exc)
-            dht_stop_event.wait(dht_interval)
+            next_read += dht_interval
+            now = time.monotonic()
+            if next_read <= now:
+                next_read = now + dht_interval
+            dht_stop_event.wait(next_read - now)
 
     try:
         motion_gate = MotionGate(idle_timeout_seconds)
@@ -613,9 +1072,15 @@ def main() -> None:
             "to set posture.nose_drop in config/settings.yaml (neck_angle 可设为 null 禁用颈部检测)"
         )
 
-    face_service = build_face_service(root, settings.get("face_recognition", {}))
+    face_cfg = settings.get("face_recognition", {}) or {}
+    face_service = build_face_service(root, face_cfg)
+    recognition_batch_size = int(face_cfg.get("batch_size", 1))
+    if recognition_batch_size > 1 and not face_service.supports_batching:
+        logger.info("face_recognition.batch_size ignored; batching needs location_model=cnn")
+        recognition_batch_size = 1
     posture_service = build_posture_service(posture_cfg)
-    storage = build_storage(settings.get("storage", {}))
+    storage_cfg = settings.get("storage") or {}
+    storage = build_storage(storage_cfg)
     retention_worker: Optional[FaceCaptureRetentionWorker] = None
     retention_cfg = settings.get("face_capture_retention", {}) or {}
     if retention_cfg:
@@ -627,6 +1092,7 @@ def main() -> None:
             max_rows=int(max_rows) if max_rows is not None else None,
             max_age_days=float(max_age_days) if max_age_days is not None else None,
             interval_seconds=interval,
+            batch_size=int(retention_cfg.get("batch_size", 1000)),
         )
         retention_worker.start()
     allowed_groups = _derive_allowed_groups(settings)
@@ -641,6 +1107,8 @@ def main() -> None:
     )
 
     capture_cfg = settings.get("capture", {})
+    apply_cv_threads(capture_cfg)
+    use_opencl = resolve_opencl(capture_cfg)
     ensure_no_proxy(settings.get("camera_url"))
 
     calibrate_posture(
@@ -650,32 +1118,93 @@ def main() -> None:
         settings.get("posture_calibration", {}),
     )
 
+    # Keep one RTSP session across PIR cycles and pause decoding instead of
+    # reconnecting on every motion event.
+    keep_stream_open = bool(pir_sensor) and bool(
+        capture_cfg.get("keep_stream_open", False)
+    )
+
+    # Opt-in: overlap Pose with face recognition on a second core. Only pays off
+    # when most frames reach posture analysis (e.g. no allowed_groups filter).
+    posture_executor = (
+        ThreadPoolExecutor(max_workers=1, thread_name_prefix="posture")
+        if capture_cfg.get("parallel_posture", False)
+        else None
+    )
+
+    # SIGINT/SIGTERM only set a flag: the capture thread polls it between frames
+    # and the loop below unwinds through the finally block, so queued storage
+    # rows are flushed on `systemctl stop` as well as on Ctrl+C. A second signal
+    # raises KeyboardInterrupt in case a stalled camera read never returns.
+    shutdown_event = threading.Event()
+
+    def _request_shutdown(_signum: int, _frame: Any) -> None:
+        # No logging here: the handler may interrupt a thread holding a sink lock.
+        shutdown_event.set()
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+    signal.signal(signal.SIGINT, _request_shutdown)
+    signal.signal(signal.SIGTERM, _request_shutdown)
+
+    stream_gate = (
+        gate_predicate(motion_gate) if pir_sensor and not keep_stream_open else None
+    )
+
+    def _should_continue() -> bool:
+        if shutdown_event.is_set():
+            return False
+        return stream_gate is None or stream_gate()
+
     def _iterate_stream() -> None:
         ensure_camera_settings(settings.get("camera_url", ""))
+        source, api_preference = resolve_stream_source(
+            settings.get("camera_url", ""), capture_cfg.get("pipeline")
+        )
         stream = CameraStream(
-            source=settings.get("camera_url", ""),
+            source=source,
+            api_preference=api_preference,
             target_fps=float(capture_cfg.get("target_fps", 15)),
             reconnect_delay=float(capture_cfg.get("reconnect_delay", 5)),
             max_retries=int(capture_cfg.get("max_retries", 3)),
             frame_saver=None,
+            convert_rgb=True,
+            use_opencl=use_opencl,
+        )
+        frame_handler = make_frame_handler(
+            face_service,
+            posture_service,
+            storage,
+            allowed_groups=allowed_groups,
+            allowed_group_grace_seconds=float(
+                capture_cfg.get("allowed_group_grace_seconds", 5.0)
+            ),
+            identity_capture=identity_capture,
+            motion_gate=motion_gate if pir_sensor else None,
+            buzzer=buzzer,
+            buzzer_beep_count=buzzer_beep_count,
+            buzzer_beep_interval=buzzer_beep_interval,
+            buzzer_min_gap_seconds=buzzer_min_gap_seconds,
+            posture_downscale_width=resolve_downscale_width(capture_cfg),
+            motion_delta=_optional_float(capture_cfg.get("motion_delta")),
+            recognition_batch_size=recognition_batch_size,
+            recognition_batch_window=float(face_cfg.get("batch_window_seconds", 0.2)),
+            face_stride=int(capture_cfg.get("face_stride", 1)),
+            posture_stride=int(capture_cfg.get("posture_stride", 1)),
+            posture_executor=posture_executor,
+            pose_guided_faces=bool(face_cfg.get("pose_guided", False)),
+            reuse_posture_when_still=bool(
+                capture_cfg.get("reuse_posture_when_still", False)
+            ),
+            posture_log_interval=float(
+                storage_cfg.get("posture_log_interval_seconds", 0.0)
+            ),
         )
         try:
             stream.iterate(
-                on_frame=make_frame_handler(
-                    face_service,
-                    posture_service,
-                    storage,
-                    allowed_groups=allowed_groups,
-                    allowed_group_grace_seconds=float(
-                        capture_cfg.get("allowed_group_grace_seconds", 5.0)
-                    ),
-                    identity_capture=identity_capture,
-                    motion_gate=motion_gate if pir_sensor else None,
-                    buzzer=buzzer,
-                    buzzer_beep_count=buzzer_beep_count,
-                    buzzer_beep_interval=buzzer_beep_interval,
-                    buzzer_min_gap_seconds=buzzer_min_gap_seconds,
-                )
+                on_frame=frame_handler,
+                should_continue=_should_continue,
+                should_decode=gate_predicate(motion_gate) if keep_stream_open else None,
             )
         except Exception as exc:  # pragma: no cover - runtime concerns
             logger.warning("Stream iteration failed: {}", exc)
@@ -683,27 +1212,40 @@ def main() -> None:
                 motion_gate.deactivate()
         finally:
             stream.release()
+            try:
+                frame_handler.flush()
+            except Exception as exc:  # pragma: no cover - runtime concerns
+                logger.warning("Unable to process buffered frames: {}", exc)
 
     try:
-        while True:
-            if pir_sensor:
+        while not shutdown_event.is_set():
+            if keep_stream_open:
+                motion_event.clear()
+            elif pir_sensor:
                 logger.info("Waiting for PIR motion to start capture")
-                try:
-                    motion_event.wait()
-                except KeyboardInterrupt:
-                    logger.info(
-                        "Interrupted while waiting for PIR motion, shutting down"
-                    )
+                while not motion_event.wait(timeout=1.0):
+                    if shutdown_event.is_set():
+                        break
+                if shutdown_event.is_set():
                     break
                 motion_event.clear()
             _iterate_stream()
             if not pir_sensor:
                 break
+            if keep_stream_open:
+                # The persistent stream only ends on errors; back off before reopening.
+                shutdown_event.wait(float(capture_cfg.get("reconnect_delay", 5)))
     except KeyboardInterrupt:
-        logger.info("Interrupted, shutting down")
+        logger.info("Interrupted again, shutting down without waiting for the stream")
     except Exception as exc:  # pragma: no cover - runtime concerns
         logger.warning("Stream ingestion failed: {}", exc)
     finally:
+        if shutdown_event.is_set():
+            logger.info("Shutdown requested, stopping")
+        if identity_capture:
+            identity_capture.close()
+        if posture_executor is not None:
+            posture_executor.shutdown(wait=True)
         storage.close()
         posture_service.close()
         if retention_worker:
@@ -1,5 +1,33 @@
-"""Posture helpers grouped under agent.posture."""
+"""Posture helpers grouped under agent.posture.
 
-from .analyze import PostureAssessment, PostureConfig, PostureService
+``analyze`` (MediaPipe) is imported on first attribute access.
+"""
+
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .analyze import PostureAssessment, PostureConfig, PostureService
+
+_EXPORTS = {
+    "PostureAssessment": ".analyze",
+    "PostureConfig": ".analyze",
+    "PostureService": ".analyze",
+}
 
 __all__ = ["PostureAssessment", "PostureConfig", "PostureService"]
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
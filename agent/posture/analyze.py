@@ -4,7 +4,7 @@ from __future__ import annotations
 
 import math
 from dataclasses import dataclass
-from typing import List, Optional, Sequence
+from typing import List, Optional, Sequence, Tuple
 
 import cv2
 import mediapipe as mp
@@ -19,6 +19,11 @@ class PostureConfig:
     nose_drop: float = 0.12
     neck_angle: Optional[float] = 45.0
     visibility_threshold: Optional[float] = 0.5
+    min_detection_confidence: float = 0.4
+    min_tracking_confidence: float = 0.4
+    # 0 = lite model (~2x faster on CPU), 1 = full, 2 = heavy.
+    model_complexity: int = 1
+    static_image_mode: bool = False
 
 
 @dataclass
@@ -35,9 +40,25 @@ class PostureService:
     def __init__(self, config: PostureConfig) -> None:
         self._config = config
         self._mp_pose = mp.solutions.pose
+        # Video mode (the default): the detector only reruns when tracking from
+        # the previous frame's ROI drops below min_tracking_confidence.
         self._pose = self._mp_pose.Pose(
-            min_detection_confidence=0.4, min_tracking_confidence=0.4
+            static_image_mode=config.static_image_mode,
+            model_complexity=config.model_complexity,
+            min_detection_confidence=config.min_detection_confidence,
+            min_tracking_confidence=config.min_tracking_confidence,
         )
+        # Landmark indices resolved once instead of enum lookups on every frame.
+        landmark = self._mp_pose.PoseLandmark
+        self._idx_nose = int(landmark.NOSE)
+        self._idx_left_shoulder = int(landmark.LEFT_SHOULDER)
+        self._idx_right_shoulder = int(landmark.RIGHT_SHOULDER)
+        self._idx_left_hip = int(landmark.LEFT_HIP)
+        self._idx_right_hip = int(landmark.RIGHT_HIP)
+        # Scratch RGB buffer for the BGR entry points; MediaPipe does not keep the
+        # image. The agent normally hands over RGB from the capture thread, so this
+        # only serves library callers and the frame handler's no-RGB fallback.
+        self._rgb_buf: Optional[np.ndarray] = None
 
     def set_thresholds(self, nose_drop: float, neck_angle: float) -> None:
         """Update posture thresholds (useful after calibration)."""
@@ -54,8 +75,24 @@ class PostureService:
     ]:
         if frame is None:
             return None, None
+        if self._rgb_buf is None or self._rgb_buf.shape != frame.shape:
+            self._rgb_buf = np.empty_like(frame)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._rgb_buf)
+        return self.analyze_rgb_with_landmarks(self._rgb_buf)
+
+    def analyze_rgb(self, rgb: "np.ndarray") -> Optional[PostureAssessment]:
+        """Like analyze(), for frames already converted to RGB (e.g. on the capture thread)."""
+        assessment, _ = self.analyze_rgb_with_landmarks(rgb)
+        return assessment
+
+    def analyze_rgb_with_landmarks(self, rgb: "np.ndarray") -> tuple[
+        Optional[PostureAssessment],
+        Optional[mp.framework.formats.landmark_pb2.NormalizedLandmarkList],
+    ]:
+        if rgb is None:
+            return None, None
 
-        landmarks = self._process_landmarks(frame)
+        landmarks = self._process_landmarks(rgb)
         if landmarks is None or not landmarks.landmark:
             logger.debug("No pose landmarks detected")
             return None, None
@@ -63,26 +100,58 @@ class PostureService:
         assessment = self._assess_landmarks(landmarks.landmark)
         return assessment, landmarks
 
+    def head_region(
+        self,
+        landmarks: Optional[landmark_pb2.NormalizedLandmarkList],
+        width: int,
+        height: int,
+        scale: float = 1.5,
+    ) -> Optional[Tuple[int, int, int, int]]:
+        """Square ``(top, right, bottom, left)`` pixel box around the head.
+
+        Centred on the nose and ``scale`` x the shoulder width wide; None when
+        the landmarks are missing or the box falls outside the frame.
+        """
+        if landmarks is None or not landmarks.landmark:
+            return None
+        lm = landmarks.landmark
+        nose = lm[self._idx_nose]
+        shoulder_width = abs(
+            lm[self._idx_left_shoulder].x - lm[self._idx_right_shoulder].x
+        )
+        half = max(shoulder_width * width * scale / 2, 1.0)
+        cx, cy = nose.x * width, nose.y * height
+        top = max(0, int(cy - half))
+        bottom = min(height, int(cy + half))
+        left = max(0, int(cx - half))
+        right = min(width, int(cx + half))
+        if bottom <= top or right <= left:
+            return None
+        return top, right, bottom, left
+
     def _process_landmarks(
-        self, frame: "np.ndarray"
+        self, rgb: "np.ndarray"
     ) -> Optional[mp.framework.formats.landmark_pb2.NormalizedLandmarkList]:
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self._pose.process(rgb)
+        # Read-only lets MediaPipe take the buffer by reference; restore the flag
+        # since the same RGB array is shared with face recognition.
+        writeable = rgb.flags.writeable
+        rgb.flags.writeable = False
+        try:
+            results = self._pose.process(rgb)
+        finally:
+            if writeable:
+                rgb.flags.writeable = True
         return results.pose_landmarks
 
     def _assess_landmarks(
         self, lm: Sequence[landmark_pb2.NormalizedLandmark]
     ) -> Optional[PostureAssessment]:
-        nose = lm[self._mp_pose.PoseLandmark.NOSE]
-        left_shoulder = lm[self._mp_pose.PoseLandmark.LEFT_SHOULDER]
-        right_shoulder = lm[self._mp_pose.PoseLandmark.RIGHT_SHOULDER]
+        nose = lm[self._idx_nose]
+        left_shoulder = lm[self._idx_left_shoulder]
+        right_shoulder = lm[self._idx_right_shoulder]
         need_neck_angle = self._config.neck_angle is not None
-        left_hip = (
-            lm[self._mp_pose.PoseLandmark.LEFT_HIP] if need_neck_angle else None
-        )
-        right_hip = (
-            lm[self._mp_pose.PoseLandmark.RIGHT_HIP] if need_neck_angle else None
-        )
+        left_hip = lm[self._idx_left_hip] if need_neck_angle else None
+        right_hip = lm[self._idx_right_hip] if need_neck_angle else None
 
         visibility_threshold = self._config.visibility_threshold
         if visibility_threshold is not None:
@@ -99,10 +168,12 @@ class PostureService:
                 )
                 return None
 
-        shoulder_center = self._average_point((left_shoulder, right_shoulder))
-        nose_drop = nose.y - shoulder_center.y
+        shoulder_center = self._midpoint(left_shoulder, right_shoulder)
+        nose_drop = nose.y - shoulder_center[1]
         neck_angle = (
-            self._angle_between(nose, shoulder_center, self._average_point((left_hip, right_hip)))
+            self._angle_between(
+                (nose.x, nose.y), shoulder_center, self._midpoint(left_hip, right_hip)
+            )
             if need_neck_angle and left_hip and right_hip
             else 0.0
         )
@@ -119,28 +190,20 @@ class PostureService:
         )
 
     @staticmethod
-    def _average_point(
-        points: Sequence[landmark_pb2.NormalizedLandmark],
-    ) -> landmark_pb2.NormalizedLandmark:
-        x = sum(point.x for point in points) / len(points)
-        y = sum(point.y for point in points) / len(points)
-        z = sum(point.z for point in points) / len(points)
-        return landmark_pb2.NormalizedLandmark(x=x, y=y, z=z)
+    def _midpoint(
+        a: landmark_pb2.NormalizedLandmark, b: landmark_pb2.NormalizedLandmark
+    ) -> Tuple[float, float]:
+        return (a.x + b.x) * 0.5, (a.y + b.y) * 0.5
 
     @staticmethod
     def _angle_between(
-        a: landmark_pb2.NormalizedLandmark,
-        b: landmark_pb2.NormalizedLandmark,
-        c: landmark_pb2.NormalizedLandmark,
+        a: Tuple[float, float], b: Tuple[float, float], c: Tuple[float, float]
     ) -> float:
-        ba = np.array([a.x - b.x, a.y - b.y])
-        bc = np.array([c.x - b.x, c.y - b.y])
-        dot = np.dot(ba, bc)
-        denom = np.linalg.norm(ba) * np.linalg.norm(bc)
-        if denom == 0:
-            return 0.0
-        cos_angle = max(min(dot / denom, 1.0), -1.0)
-        return math.degrees(math.acos(cos_angle))
+        """Angle ABC in degrees; plain floats, since numpy dispatch outweighs 2D math."""
+        bax, bay = a[0] - b[0], a[1] - b[1]
+        bcx, bcy = c[0] - b[0], c[1] - b[1]
+        # atan2(|cross|, dot) is 0 for degenerate vectors, like the old zero-norm guard.
+        return math.degrees(abs(math.atan2(bax * bcy - bay * bcx, bax * bcx + bay * bcy)))
 
     @staticmethod
     def _is_confident(lm: landmark_pb2.NormalizedLandmark, threshold: float) -> bool:
@@ -1,5 +1,29 @@
-"""Recognition helpers grouped under agent.recognition."""
+"""Recognition helpers grouped under agent.recognition.
 
-from .face import FaceMatch, FaceService
+``face`` (face_recognition/dlib) is imported on first attribute access.
+"""
+
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .face import FaceMatch, FaceService
+
+_EXPORTS = {"FaceMatch": ".face", "FaceService": ".face"}
 
 __all__ = ["FaceMatch", "FaceService"]
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
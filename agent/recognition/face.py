@@ -3,18 +3,29 @@
 from __future__ import annotations
 
 import hashlib
+import multiprocessing
+import os
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterator, List, Sequence, Tuple
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
 
 import cv2
 import face_recognition
 import numpy as np
 from loguru import logger
 
+# Encodings of data/known are cached next to the images; bump the version when
+# the encoding step changes so stale caches are rebuilt.
+ENCODING_CACHE_NAME = ".sg_faces_cache.npz"
+_ENCODING_CACHE_VERSION = 1
+# A lone face this close to the previously matched reference (relative to the
+# tolerance) is accepted without scanning every known encoding.
+_STRONG_MATCH_RATIO = 0.7
 
-@dataclass
+
+@dataclass(slots=True)
 class FaceMatch:
     identity: str
     distance: float
@@ -25,34 +36,114 @@ def _hash_path(path: Path) -> str:
     return hashlib.sha1(str(path).encode("utf-8")).hexdigest()[:8]
 
 
-def _iter_identity_dirs(base_dir: Path) -> Iterator[Tuple[str, Path]]:
-    try:
-        children = sorted(base_dir.iterdir(), key=lambda item: item.name)
-    except PermissionError:
-        logger.warning("Cannot access {}, skipping", base_dir)
-        return
+def _iter_identity_dirs(base_dir: Path) -> Iterator[Tuple[str, List[Path]]]:
+    """Yield ``(identity, image files)`` for every folder under ``base_dir`` with files.
 
-    def _walk(current: Path) -> Iterator[Tuple[str, Path]]:
-        if not current.is_dir():
-            return
+    One ``os.scandir`` pass per folder: DirEntry caches the file type, so files
+    and subfolders are split without an extra stat or a second listing.
+    """
+
+    def _scan(current: Path) -> Optional[List[os.DirEntry]]:
         try:
-            entries = sorted(current.iterdir(), key=lambda item: item.name)
+            with os.scandir(current) as it:
+                return sorted(it, key=lambda entry: entry.name)
         except PermissionError:
             logger.warning("Cannot access {}, skipping", current)
-            return
+            return None
 
+    def _walk(current: Path) -> Iterator[Tuple[str, List[Path]]]:
+        entries = _scan(current)
+        if entries is None:
+            return
         files = [entry for entry in entries if entry.is_file()]
         if files:
             identity = current.relative_to(base_dir).as_posix()
-            yield identity, current
+            # Hidden files (e.g. editor swap files) are not reference images.
+            yield identity, [
+                Path(entry.path) for entry in files if not entry.name.startswith(".")
+            ]
 
         for entry in entries:
             if entry.is_dir():
-                yield from _walk(entry)
+                yield from _walk(Path(entry.path))
 
+    children = _scan(base_dir)
+    if children is None:
+        return
     for child in children:
         if child.is_dir():
-            yield from _walk(child)
+            yield from _walk(Path(child.path))
+
+
+def _known_images(base_dir: Path) -> Iterator[Tuple[str, Path]]:
+    for identity, image_paths in _iter_identity_dirs(base_dir):
+        for image_path in image_paths:
+            yield identity, image_path
+
+
+def _encode_image(image_path: str) -> Optional[np.ndarray]:
+    """First face encoding in an image file (runs in worker processes)."""
+    image = face_recognition.load_image_file(image_path)
+    faces = face_recognition.face_encodings(image)
+    return faces[0] if faces else None
+
+
+def _encode_images(paths: Sequence[str], workers: int) -> List[Optional[np.ndarray]]:
+    if workers <= 1 or len(paths) <= 1:
+        return [_encode_image(path) for path in paths]
+    # dlib holds the GIL for much of the encoder, so processes rather than threads.
+    # Spawned, not forked: by now the agent runs logging, sensor and GPIO threads,
+    # and forking a multi-threaded process can deadlock the child on their locks.
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(paths)),
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as executor:
+        return list(executor.map(_encode_image, paths, chunksize=4))
+
+
+def _manifest_digest(base_dir: Path) -> str:
+    """Hash every known image's (identity, name, mtime, size) without reading it."""
+    digest = hashlib.sha1(f"v{_ENCODING_CACHE_VERSION}".encode("utf-8"))
+    for identity, image_path in _known_images(base_dir):
+        stat = image_path.stat()
+        digest.update(
+            f"{identity}\0{image_path.name}\0{stat.st_mtime_ns}\0{stat.st_size}\n".encode(
+                "utf-8"
+            )
+        )
+    return digest.hexdigest()
+
+
+def _load_encoding_cache(
+    path: Path, digest: str
+) -> Optional[Tuple[List[np.ndarray], List[str]]]:
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            if str(data["digest"]) != digest:
+                return None
+            return list(data["encodings"]), data["labels"].tolist()
+    except FileNotFoundError:
+        return None
+    except Exception as exc:  # pragma: no cover - corrupt/partial cache
+        logger.warning("Ignoring unreadable face encoding cache {}: {}", path, exc)
+        return None
+
+
+def _save_encoding_cache(
+    path: Path, digest: str, encodings: Sequence[np.ndarray], labels: Sequence[str]
+) -> None:
+    tmp_path = path.with_name(path.name + ".tmp")
+    try:
+        with open(tmp_path, "wb") as handle:
+            np.savez_compressed(
+                handle,
+                digest=np.array(digest),
+                encodings=np.stack(encodings),
+                labels=np.array(labels, dtype=str),
+            )
+        os.replace(tmp_path, path)
+    except OSError as exc:  # pragma: no cover - read-only known_dir etc.
+        logger.warning("Could not write face encoding cache {}: {}", path, exc)
 
 
 class FaceService:
@@ -65,14 +156,43 @@ class FaceService:
         tolerance: float = 0.55,
         location_model: str = "hog",
         min_face_area_ratio: float | None = None,
+        detection_scale: float = 1.0,
+        upsample: int = 1,
     ) -> None:
-        self._encodings = list(encodings)
+        # Known encodings as one contiguous (N, 128) float32 matrix so every
+        # detected face is scored against all of them in one vectorized pass;
+        # float32 halves the bytes streamed per frame at no cost to the threshold.
+        self._known = (
+            np.ascontiguousarray(np.stack(encodings), dtype=np.float32)
+            if len(encodings)
+            else None
+        )
+        # Squared norms of the known encodings, reused by every distance matrix.
+        self._known_sq = (
+            np.einsum("ij,ij->i", self._known, self._known)
+            if self._known is not None
+            else None
+        )
         self._labels = list(labels)
+        # Labels are fixed after loading, so each one's top-level group is resolved once.
+        self._identity_groups: Dict[str, str] = {
+            label: label.partition("/")[0] or "unknown" for label in self._labels
+        }
+        self._identity_groups.setdefault("unknown", "unknown")
         self._tolerance = tolerance
         self._location_model = location_model
         self._min_face_area_ratio = (
             min_face_area_ratio if min_face_area_ratio and min_face_area_ratio > 0 else None
         )
+        # Detection runs on a frame shrunk by detection_scale (cost ~ pixels);
+        # boxes are mapped back so encodings still use the full-resolution face.
+        self._detection_scale = (
+            detection_scale if detection_scale and 0 < detection_scale < 1 else 1.0
+        )
+        self._upsample = max(0, int(upsample))
+        # Index of the last matched reference; a person at the desk usually
+        # stays the same from frame to frame.
+        self._last_best: int | None = None
 
     @classmethod
     def from_known_directory(
@@ -81,36 +201,73 @@ class FaceService:
         tolerance: float = 0.55,
         location_model: str = "hog",
         min_face_area_ratio: float | None = None,
+        detection_scale: float = 1.0,
+        upsample: int = 1,
+        use_cache: bool = True,
+        encode_workers: Optional[int] = None,
     ) -> "FaceService":
+        """Encode every image under ``base_dir`` (one folder per identity).
+
+        With ``use_cache`` the encodings are stored in ``ENCODING_CACHE_NAME``
+        and reused until any image is added, removed or modified. Cache misses
+        encode images on ``encode_workers`` processes (default: half the cores).
+        """
         base_dir = base_dir.resolve()
         if not base_dir.exists():
             logger.warning(
                 "Known face directory {} does not exist, no identities loaded", base_dir
             )
-            return cls([], [], tolerance, location_model, min_face_area_ratio)
+            return cls(
+                [],
+                [],
+                tolerance,
+                location_model,
+                min_face_area_ratio,
+                detection_scale=detection_scale,
+                upsample=upsample,
+            )
+
+        cache_path = base_dir / ENCODING_CACHE_NAME
+        digest = _manifest_digest(base_dir) if use_cache else ""
+        cached = _load_encoding_cache(cache_path, digest) if use_cache else None
+        if cached is not None:
+            encodings, labels = cached
+            logger.info(
+                "Loaded {} known face encoding(s) from cache {}",
+                len(encodings),
+                cache_path,
+            )
+            return cls(
+                encodings,
+                labels,
+                tolerance,
+                location_model,
+                min_face_area_ratio,
+                detection_scale=detection_scale,
+                upsample=upsample,
+            )
 
-        encodings: List[np.ndarray] = []
-        labels: List[str] = []
+        encodings = []
+        labels = []
         per_identity_counts: dict[str, int] = defaultdict(int)
 
-        for identity, person_dir in _iter_identity_dirs(base_dir):
-            for image_path in sorted(person_dir.glob("*")):
-                if not image_path.is_file():
-                    continue
-                image = face_recognition.load_image_file(str(image_path))
-                faces = face_recognition.face_encodings(image)
-                if not faces:
-                    logger.warning("No face detected in {}, skipping", image_path)
-                    continue
-                encodings.append(faces[0])
-                labels.append(identity)
-                per_identity_counts[identity] += 1
-                logger.info(
-                    "Loaded {} ({}) with hash {}",
-                    identity,
-                    image_path.name,
-                    _hash_path(image_path),
-                )
+        images = list(_known_images(base_dir))
+        if encode_workers is None:
+            encode_workers = max(1, (os.cpu_count() or 2) // 2)
+        encoded = _encode_images([str(path) for _, path in images], encode_workers)
+        for (identity, image_path), encoding in zip(images, encoded):
+            if encoding is None:
+                logger.warning("No face detected in {}, skipping", image_path)
+                continue
+            encodings.append(encoding)
+            labels.append(identity)
+            per_identity_counts[identity] += 1
+            logger.info(
+                "Loaded {} ({}) with hash {}",
+                identity,
+                image_path.name,
+                _hash_path(image_path),
+            )
 
         if not encodings:
             logger.warning("No known faces loaded from {}", base_dir)
@@ -119,45 +276,186 @@ class FaceService:
                 logger.info(
                     "Loaded {} reference image(s) for identity {}", count, identity
                 )
+            if use_cache:
+                _save_encoding_cache(cache_path, digest, encodings, labels)
+
+        return cls(
+            encodings,
+            labels,
+            tolerance,
+            location_model,
+            min_face_area_ratio,
+            detection_scale=detection_scale,
+            upsample=upsample,
+        )
+
+    @property
+    def identity_groups(self) -> Mapping[str, str]:
+        """Map every identity this service can return to its group (``child/a`` -> ``child``)."""
+        return self._identity_groups
 
-        return cls(encodings, labels, tolerance, location_model, min_face_area_ratio)
+    @property
+    def supports_batching(self) -> bool:
+        """Only the CNN detector benefits from running several frames at once."""
+        return self._location_model == "cnn"
 
     def recognize(self, frame: "np.ndarray") -> List[FaceMatch]:
         if frame is None:
             return []
+        return self.recognize_rgb(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+
+    def recognize_rgb(self, rgb: "np.ndarray") -> List[FaceMatch]:
+        """Like recognize(), for frames already converted to RGB (shared with posture)."""
+        if rgb is None:
+            return []
+        locations = face_recognition.face_locations(
+            self._detection_input(rgb),
+            number_of_times_to_upsample=self._upsample,
+            model=self._location_model,
+        )
+        return self._match_locations(rgb, self._rescale_locations(rgb, locations))
+
+    def recognize_rgb_region(
+        self, rgb: "np.ndarray", region: Tuple[int, int, int, int]
+    ) -> List[FaceMatch]:
+        """recognize_rgb() restricted to a ``(top, right, bottom, left)`` region.
+
+        Only the region is searched by the detector; boxes and encodings still
+        use full-frame coordinates, so the area filter behaves the same.
+        """
+        if rgb is None:
+            return []
+        top, right, bottom, left = region
+        crop = rgb[top:bottom, left:right]
+        if crop.size == 0:
+            return []
+        locations = face_recognition.face_locations(
+            self._detection_input(crop),
+            number_of_times_to_upsample=self._upsample,
+            model=self._location_model,
+        )
+        return self._match_locations(
+            rgb,
+            [
+                (t + top, r + left, b + top, l + left)
+                for t, r, b, l in self._rescale_locations(crop, locations)
+            ],
+        )
+
+    def recognize_batch_rgb(self, rgbs: Sequence["np.ndarray"]) -> List[List[FaceMatch]]:
+        """Batched recognize_rgb(); falls back to per-frame calls for the HOG detector."""
+        if not self.supports_batching or len(rgbs) <= 1:
+            return [self.recognize_rgb(rgb) for rgb in rgbs]
+
+        batched_locations = face_recognition.batch_face_locations(
+            [self._detection_input(rgb) for rgb in rgbs],
+            number_of_times_to_upsample=self._upsample,
+            batch_size=len(rgbs),
+        )
+        return [
+            self._match_locations(rgb, self._rescale_locations(rgb, locations))
+            for rgb, locations in zip(rgbs, batched_locations)
+        ]
 
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    def _detection_input(self, rgb: "np.ndarray") -> "np.ndarray":
+        if self._detection_scale >= 1.0:
+            return rgb
+        return cv2.resize(
+            rgb,
+            (0, 0),
+            fx=self._detection_scale,
+            fy=self._detection_scale,
+            interpolation=cv2.INTER_AREA,
+        )
+
+    def _rescale_locations(
+        self, rgb: "np.ndarray", locations: Sequence[Tuple[int, int, int, int]]
+    ) -> List[Tuple[int, int, int, int]]:
+        """Map boxes found on the shrunk frame back to full-resolution pixels."""
+        if self._detection_scale >= 1.0 or not locations:
+            return list(locations)
+        inv = 1.0 / self._detection_scale
+        height, width = rgb.shape[:2]
+        return [
+            (
+                max(0, int(top * inv)),
+                min(width, int(right * inv)),
+                min(height, int(bottom * inv)),
+                max(0, int(left * inv)),
+            )
+            for top, right, bottom, left in locations
+        ]
+
+    def _match_locations(
+        self, rgb: "np.ndarray", locations: Sequence[Tuple[int, int, int, int]]
+    ) -> List[FaceMatch]:
         frame_area = float(rgb.shape[0] * rgb.shape[1]) if rgb.size else None
-        locations = face_recognition.face_locations(rgb, model=self._location_model)
-        encodings = face_recognition.face_encodings(rgb, locations)
-        matches: List[FaceMatch] = []
+        if frame_area and self._min_face_area_ratio is not None:
+            # Drop tiny candidates before paying for their encodings.
+            locations = [
+                location
+                for location in locations
+                if self._large_enough(location, frame_area)
+            ]
+        if not locations:
+            return []
+        if self._known is None:
+            return [FaceMatch("unknown", 1.0, location) for location in locations]
 
-        for location, encoding in zip(locations, encodings):
-            if frame_area and self._min_face_area_ratio is not None:
-                top, right, bottom, left = location
-                width = max(right - left, 0)
-                height = max(bottom - top, 0)
-                area_ratio = (width * height) / frame_area if frame_area > 0 else 0.0
-                if area_ratio < self._min_face_area_ratio:
-                    logger.debug(
-                        "Ignoring tiny face candidate (area ratio {:.4f} < {:.4f})",
-                        area_ratio,
-                        self._min_face_area_ratio,
+        encodings = np.asarray(
+            face_recognition.face_encodings(rgb, locations), dtype=np.float32
+        )
+        if len(locations) == 1 and self._last_best is not None:
+            hint_distance = float(
+                np.linalg.norm(encodings[0] - self._known[self._last_best])
+            )
+            if hint_distance <= self._tolerance * _STRONG_MATCH_RATIO:
+                return [
+                    FaceMatch(
+                        self._labels[self._last_best], hint_distance, locations[0]
                     )
-                    continue
-
-            if not self._encodings:
-                matches.append(FaceMatch("unknown", 1.0, location))
-                continue
+                ]
+        # (faces, known) squared Euclidean distances from one GEMM,
+        # |q|^2 + |k|^2 - 2 q.k, instead of materialising a (faces, known, 128)
+        # difference tensor; same metric as face_recognition.face_distance.
+        sq_distances = (
+            np.einsum("ij,ij->i", encodings, encodings)[:, np.newaxis]
+            + self._known_sq[np.newaxis, :]
+            - 2.0 * (encodings @ self._known.T)
+        )
+        best_indices = sq_distances.argmin(axis=1)
+        best_distances = np.sqrt(
+            np.maximum(sq_distances[np.arange(len(locations)), best_indices], 0.0)
+        )
 
-            distances = face_recognition.face_distance(self._encodings, encoding)
-            best_idx = int(np.argmin(distances))
-            best_distance = float(distances[best_idx])
+        matches: List[FaceMatch] = []
+        for location, best_idx, best_distance in zip(
+            locations, best_indices.tolist(), best_distances.tolist()
+        ):
             identity = (
                 self._labels[best_idx]
                 if best_distance <= self._tolerance
                 else "unknown"
             )
             matches.append(FaceMatch(identity, best_distance, location))
-
+        if len(matches) == 1:
+            self._last_best = (
+                best_indices[0].item() if matches[0].identity != "unknown" else None
+            )
         return matches
+
+    def _large_enough(
+        self, location: Tuple[int, int, int, int], frame_area: float
+    ) -> bool:
+        top, right, bottom, left = location
+        width = max(right - left, 0)
+        height = max(bottom - top, 0)
+        area_ratio = (width * height) / frame_area
+        if area_ratio < self._min_face_area_ratio:
+            logger.debug(
+                "Ignoring tiny face candidate (area ratio {:.4f} < {:.4f})",
+                area_ratio,
+                self._min_face_area_ratio,
+            )
+            return False
+        return True
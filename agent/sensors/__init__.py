@@ -1,8 +1,30 @@
-"""Sensor helpers used by the agent (e.g., PIR, buzzer)."""
+"""Sensor helpers used by the agent (e.g., PIR, buzzer).
 
-from agent.sensors.buzzer import Buzzer, BuzzerConfig, build_buzzer
-from agent.sensors.dht import DHT22Config, DHT22Sensor, build_dht22_sensor
-from agent.sensors.pir import PIRConfig, PIRSensor, build_pir_sensor
+Exports are resolved lazily (PEP 562) so importing one sensor does not pull in
+the GPIO/CircuitPython stacks of the others.
+"""
+
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from agent.sensors.buzzer import Buzzer, BuzzerConfig, build_buzzer
+    from agent.sensors.dht import DHT22Config, DHT22Sensor, build_dht22_sensor
+    from agent.sensors.pir import PIRConfig, PIRSensor, build_pir_sensor
+
+_EXPORTS = {
+    "Buzzer": ".buzzer",
+    "BuzzerConfig": ".buzzer",
+    "build_buzzer": ".buzzer",
+    "DHT22Config": ".dht",
+    "DHT22Sensor": ".dht",
+    "build_dht22_sensor": ".dht",
+    "PIRConfig": ".pir",
+    "PIRSensor": ".pir",
+    "build_pir_sensor": ".pir",
+}
 
 __all__ = [
     "Buzzer",
@@ -15,3 +37,16 @@ __all__ = [
     "build_buzzer",
     "build_pir_sensor",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value  # later lookups skip __getattr__
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
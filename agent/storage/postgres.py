@@ -2,8 +2,33 @@
 
 from __future__ import annotations
 
+import io
+import os
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import List
+from functools import lru_cache
+from datetime import datetime, timezone
+from typing import Iterator, List, Tuple
+
+from loguru import logger
+
+_FACE_COLUMNS = ("id", "identity", "group_tag", "face_distance", "frame_path", "timestamp")
+_POSTURE_COLUMNS = (
+    "id",
+    "identity",
+    "is_bad",
+    "nose_drop",
+    "neck_angle",
+    "reasons",
+    "face_distance",
+    "frame_path",
+    "face_capture_id",
+    "timestamp",
+)
 
 
 @dataclass
@@ -12,12 +37,67 @@ class StorageConfig:
     posture_table: str = "posture_events"
     face_table: str = "face_captures"
     reset_on_start: bool = False
+    batch_size: int = 100
+    flush_interval_seconds: float = 1.0
+    queue_size: int = 1024
+    pool_size: int = 2  # values below 2 are raised to 2 (writer + retention)
+    # Events are already buffered in memory and dropped when the queue is full,
+    # so waiting for the WAL flush buys little: with this off, a server crash can
+    # lose the last fraction of a second of commits, but never corrupts data.
+    synchronous_commit: bool = False
+
+
+_STOP = object()
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _copy_value(value: object) -> str:
+    """Render one value in PostgreSQL COPY text format."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value).translate(_COPY_ESCAPES)
+
+
+def _uuid7() -> str:
+    """Time-ordered UUID (RFC 9562 v7): ids from one process land at the right
+    edge of the primary-key btree instead of at random pages."""
+    millis = time.time_ns() // 1_000_000
+    rand = int.from_bytes(os.urandom(10), "big")
+    value = (millis & 0xFFFF_FFFF_FFFF) << 80
+    value |= 0x7 << 76 | (rand >> 62 & 0xFFF) << 64
+    value |= 0b10 << 62 | rand & 0x3FFF_FFFF_FFFF_FFFF
+    return str(uuid.UUID(int=value))
+
+
+@lru_cache(maxsize=64)
+def _join_reasons(reasons: Tuple[str, ...]) -> str:
+    """Posture reasons come from a small fixed set, so the joined text is cached."""
+    return ", ".join(reasons)
+
+
+def _copy_buffer(rows: List[Tuple]) -> io.StringIO:
+    buffer = io.StringIO()
+    buffer.writelines("\t".join(map(_copy_value, row)) + "\n" for row in rows)
+    buffer.seek(0)
+    return buffer
 
 
 class Storage:
+    """Queue face/posture events and write them to PostgreSQL in batches.
+
+    Rows carry their own timestamp and face capture ids are generated client-side,
+    so posture rows can reference a face capture before either is written. A
+    single writer thread owns the inserts; the frame thread never waits on the
+    database and drops events when the queue is full.
+    """
+
     def __init__(self, config: StorageConfig) -> None:
         try:
-            import psycopg2  # type: ignore[import]
+            import psycopg2.pool  # type: ignore[import]
         except ImportError as exc:  # pragma: no cover - runtime helper
             raise RuntimeError(
                 "psycopg2-binary is required for PostgreSQL storage"
@@ -26,58 +106,129 @@ class Storage:
         if not config.postgres_dsn:
             raise ValueError("PostgreSQL DSN must be provided")
 
-        self._conn = psycopg2.connect(config.postgres_dsn)
+        # The writer thread and the retention worker each check out their own
+        # connection, so a long prune never blocks event inserts. The pool raises
+        # PoolError instead of waiting when it is exhausted, so it never holds
+        # fewer than those two.
+        self._pool = psycopg2.pool.ThreadedConnectionPool(
+            1, max(2, int(config.pool_size)), config.postgres_dsn
+        )
+        # Errors after which a connection is discarded instead of returned.
+        self._connection_errors = (psycopg2.OperationalError, psycopg2.InterfaceError)
         self._posture_table = config.posture_table
         self._face_table = config.face_table
-        self._param = "%s"
+        # Table names are fixed per instance, so the COPY statements are built once.
+        self._face_copy_sql = self._copy_sql(self._face_table, _FACE_COLUMNS)
+        self._posture_copy_sql = self._copy_sql(self._posture_table, _POSTURE_COLUMNS)
         self._reset_on_start = bool(config.reset_on_start)
+        self._synchronous_commit = bool(config.synchronous_commit)
+        self._batch_size = max(1, int(config.batch_size))
+        self._flush_interval = max(0.05, float(config.flush_interval_seconds))
+        self._queue: "queue.Queue[object]" = queue.Queue(
+            maxsize=max(1, int(config.queue_size))
+        )
+        self._dropped = 0
         if self._reset_on_start:
             self.reset()
         self._ensure_tables()
+        self._writer = threading.Thread(
+            target=self._write_loop, name="storage-writer", daemon=True
+        )
+        self._writer.start()
 
     def prune_face_captures(
         self,
         max_rows: int | None = None,
         max_age_days: float | None = None,
+        batch_size: int = 1000,
     ) -> int:
-        """Delete old face captures by age or keep-most-recent row count."""
-        cursor = self._conn.cursor()
+        """Delete old face captures by age or keep-most-recent row count.
+
+        Rows are removed in chunks of ``batch_size``, each in its own transaction.
+        """
+        with self._connection() as conn:
+            return self._prune_face_captures(
+                conn, max_rows, max_age_days, max(1, int(batch_size))
+            )
+
+    @contextmanager
+    def _connection(self) -> Iterator:
+        """Borrow a pooled connection; roll back if the caller fails mid-transaction.
+
+        A connection that was closed or raised a connection-level error is closed
+        rather than returned, so the pool never hands it out again.
+        """
+        conn = self._pool.getconn()
+        broken = False
+        try:
+            yield conn
+        except self._connection_errors:
+            broken = True
+            raise
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._pool.putconn(conn, close=broken or bool(conn.closed))
+
+    def _prune_face_captures(
+        self,
+        conn,
+        max_rows: int | None,
+        max_age_days: float | None,
+        batch_size: int,
+    ) -> int:
+        # Short per-chunk transactions keep row locks (and the cascading posture
+        # deletes) brief, so the writer thread's COPYs are not held up.
+        cursor = conn.cursor()
         deleted = 0
 
         if max_age_days is not None:
-            cursor.execute(
-                f"DELETE FROM {self._face_table} "
-                "WHERE timestamp < (NOW() - (%s || ' days')::interval)",
-                (max_age_days,),
-            )
-            deleted += cursor.rowcount
+            while True:
+                cursor.execute(
+                    f"DELETE FROM {self._face_table} WHERE ctid IN ("
+                    f"  SELECT ctid FROM {self._face_table}"
+                    "  WHERE timestamp < NOW() - make_interval(secs => %s)"
+                    "  LIMIT %s"
+                    ")",
+                    (float(max_age_days) * 86400.0, batch_size),
+                )
+                conn.commit()
+                deleted += cursor.rowcount
+                if cursor.rowcount < batch_size:
+                    break
 
         if max_rows is not None and max_rows > 0:
             cursor.execute(f"SELECT COUNT(*) FROM {self._face_table}")
-            count = cursor.fetchone()[0] or 0
-            if count > max_rows:
-                to_delete = count - max_rows
+            remaining = (cursor.fetchone()[0] or 0) - max_rows
+            conn.commit()
+            while remaining > 0:
                 cursor.execute(
-                    f"DELETE FROM {self._face_table} "
-                    "WHERE id IN ("
-                    "  SELECT id FROM {table} ORDER BY timestamp ASC LIMIT %s"
-                    ")".format(table=self._face_table),
-                    (to_delete,),
+                    f"DELETE FROM {self._face_table} WHERE ctid IN ("
+                    f"  SELECT ctid FROM {self._face_table}"
+                    "  ORDER BY timestamp ASC LIMIT %s"
+                    ")",
+                    (min(remaining, batch_size),),
                 )
+                conn.commit()
+                if cursor.rowcount <= 0:
+                    break
                 deleted += cursor.rowcount
+                remaining -= cursor.rowcount
 
-        self._conn.commit()
         cursor.close()
         return deleted
 
     def _ensure_tables(self) -> None:
-        cursor = self._conn.cursor()
-        cursor.execute('CREATE EXTENSION IF NOT EXISTS "uuid-ossp";')
-        cursor.execute(self._create_face_table_sql())
-        cursor.execute(self._create_posture_table_sql())
-        self._ensure_posture_fk_cascade(cursor)
-        cursor.close()
-        self._conn.commit()
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS "uuid-ossp";')
+            cursor.execute(self._create_face_table_sql())
+            cursor.execute(self._create_posture_table_sql())
+            self._ensure_posture_fk_cascade(cursor)
+            cursor.execute(self._create_indexes_sql())
+            cursor.close()
+            conn.commit()
 
     def log_posture(
         self,
@@ -90,37 +241,21 @@ class Storage:
         frame_path: str | None = None,
         face_capture_id: str | None = None,
     ) -> None:
-        columns = [
-            "identity",
-            "is_bad",
-            "nose_drop",
-            "neck_angle",
-            "reasons",
-            "face_distance",
-            "frame_path",
-            "face_capture_id",
-        ]
-        placeholders = ", ".join([self._param] * len(columns))
-        query = (
-            f"INSERT INTO {self._posture_table} "
-            f"({', '.join(columns)}) VALUES ({placeholders})"
-        )
-        cursor = self._conn.cursor()
-        cursor.execute(
-            query,
+        self._enqueue(
             (
+                False,
+                _uuid7(),
                 identity,
                 is_bad,
                 nose_drop,
                 neck_angle,
-                ", ".join(reasons),
+                _join_reasons(tuple(reasons)),
                 face_distance,
                 frame_path,
                 face_capture_id,
+                datetime.now(timezone.utc),
             ),
         )
-        cursor.close()
-        self._conn.commit()
 
     def log_face_capture(
         self,
@@ -128,19 +263,96 @@ class Storage:
         group_tag: str,
         face_distance: float | None,
         frame_path: str | None,
-    ) -> str:
-        columns = ["identity", "group_tag", "face_distance", "frame_path"]
-        placeholders = ", ".join([self._param] * len(columns))
-        query = (
-            f"INSERT INTO {self._face_table} "
-            f"({', '.join(columns)}) VALUES ({placeholders}) RETURNING id"
+    ) -> str | None:
+        """Queue a face capture row; returns its id, or None if it was dropped."""
+        face_id = _uuid7()
+        queued = self._enqueue(
+            (
+                True,
+                face_id,
+                identity,
+                group_tag,
+                face_distance,
+                frame_path,
+                datetime.now(timezone.utc),
+            ),
         )
-        cursor = self._conn.cursor()
-        cursor.execute(query, (identity, group_tag, face_distance, frame_path))
-        face_id = cursor.fetchone()[0]
-        cursor.close()
-        self._conn.commit()
-        return str(face_id)
+        return face_id if queued else None
+
+    def _enqueue(self, item: Tuple) -> bool:
+        """Hand a row to the writer thread; never blocks the caller."""
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            self._dropped += 1
+            if self._dropped == 1 or self._dropped % 100 == 0:
+                logger.warning(
+                    "Storage queue full; dropped {} event(s) so far", self._dropped
+                )
+            return False
+
+    def _write_loop(self) -> None:
+        faces: List[Tuple] = []
+        postures: List[Tuple] = []
+        deadline: float | None = None
+        stopping = False
+        while not stopping:
+            timeout = (
+                self._flush_interval
+                if deadline is None
+                else max(0.0, deadline - time.monotonic())
+            )
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                stopping = True
+            elif item is not None:
+                (faces if item[0] else postures).append(item[1:])
+                if deadline is None:
+                    deadline = time.monotonic() + self._flush_interval
+            if (
+                stopping
+                or len(faces) + len(postures) >= self._batch_size
+                or (deadline is not None and time.monotonic() >= deadline)
+            ):
+                try:
+                    self._write_batch(faces, postures)
+                except Exception as exc:  # pragma: no cover - runtime safeguard
+                    logger.warning("Storage flush failed: {}", exc)
+                faces, postures = [], []
+                deadline = None
+
+    def _write_batch(self, faces: List[Tuple], postures: List[Tuple]) -> None:
+        if not faces and not postures:
+            return
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            try:
+                if not self._synchronous_commit:
+                    cursor.execute("SET LOCAL synchronous_commit = off")
+                # Faces first so posture rows can satisfy their face_capture_id FK.
+                if faces:
+                    cursor.copy_expert(self._face_copy_sql, _copy_buffer(faces))
+                if postures:
+                    cursor.copy_expert(self._posture_copy_sql, _copy_buffer(postures))
+                conn.commit()
+            except Exception as exc:
+                conn.rollback()
+                logger.warning(
+                    "Dropped {} face / {} posture row(s) after write failure: {}",
+                    len(faces),
+                    len(postures),
+                    exc,
+                )
+            finally:
+                cursor.close()
+
+    @staticmethod
+    def _copy_sql(table: str, columns: Tuple[str, ...]) -> str:
+        return f"COPY {table} ({', '.join(columns)}) FROM STDIN"
 
     def reset(self) -> None:
         self._drop_table(self._posture_table)
@@ -148,13 +360,23 @@ class Storage:
         self._ensure_tables()
 
     def _drop_table(self, table_name: str) -> None:
-        cursor = self._conn.cursor()
-        cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
-        cursor.close()
-        self._conn.commit()
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
+            cursor.close()
+            conn.commit()
 
     def close(self) -> None:
-        self._conn.close()
+        """Write everything still queued, then close the pooled connections."""
+        try:
+            # A full queue with a stuck writer must not hang shutdown.
+            self._queue.put(_STOP, timeout=self._flush_interval + 5.0)
+        except queue.Full:  # pragma: no cover - stuck database
+            logger.warning("Storage queue still full; not waiting for the writer")
+        self._writer.join(timeout=self._flush_interval + 5.0)
+        if self._writer.is_alive():  # pragma: no cover - stuck database
+            logger.warning("Storage writer did not finish; closing connections anyway")
+        self._pool.closeall()
 
     def _create_face_table_sql(self) -> str:
         return f"""
@@ -184,6 +406,17 @@ CREATE TABLE IF NOT EXISTS {self._posture_table} (
 );
 """
 
+    def _create_indexes_sql(self) -> str:
+        # timestamp: retention prunes by age and oldest-first without a full scan.
+        # face_capture_id: each face row deleted by retention cascades to
+        # posture rows, which would otherwise be a sequential scan per face row.
+        return f"""
+CREATE INDEX IF NOT EXISTS ix_{self._face_table}_timestamp
+  ON {self._face_table} (timestamp);
+CREATE INDEX IF NOT EXISTS ix_{self._posture_table}_face_capture_id
+  ON {self._posture_table} (face_capture_id);
+"""
+
     def _ensure_posture_fk_cascade(self, cursor) -> None:
         """Ensure posture table FK cascades when face capture rows are deleted."""
         posture_table = self._posture_table
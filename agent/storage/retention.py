@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import threading
+import time
 from typing import Optional
 
 from loguru import logger
@@ -19,11 +20,13 @@ class FaceCaptureRetentionWorker:
         max_rows: Optional[int] = None,
         max_age_days: Optional[float] = None,
         interval_seconds: float = 600.0,
+        batch_size: int = 1000,
     ) -> None:
         self._storage = storage
         self._max_rows = max_rows
         self._max_age_days = max_age_days
         self._interval = interval_seconds
+        self._batch_size = batch_size
         self._stop_event = threading.Event()
         self._thread = threading.Thread(target=self._run, daemon=True)
 
@@ -46,13 +49,23 @@ class FaceCaptureRetentionWorker:
         self._thread.join(timeout=5)
 
     def _run(self) -> None:
+        # Schedule on a fixed monotonic grid so prune time does not push later
+        # runs back; after an overrun, restart the grid one interval from now
+        # instead of pruning again straight away.
+        next_run = time.monotonic()
         while not self._stop_event.is_set():
             try:
                 deleted = self._storage.prune_face_captures(
-                    max_rows=self._max_rows, max_age_days=self._max_age_days
+                    max_rows=self._max_rows,
+                    max_age_days=self._max_age_days,
+                    batch_size=self._batch_size,
                 )
                 if deleted:
                     logger.info("Pruned {} face capture record(s)", deleted)
             except Exception as exc:  # pragma: no cover - runtime safeguard
                 logger.warning("Face capture retention failed: {}", exc)
-            self._stop_event.wait(self._interval)
+            next_run += self._interval
+            now = time.monotonic()
+            if next_run < now:
+                next_run = now + self._interval
+            self._stop_event.wait(next_run - now)
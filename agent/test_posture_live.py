@@ -9,8 +9,18 @@ from typing import Any, Dict
 
 from loguru import logger
 
-from agent.capture import CameraStream, ensure_camera_settings
-from agent.main import build_posture_service, ensure_no_proxy, load_settings
+from agent.capture import (
+    CameraStream,
+    downscale_frame,
+    ensure_camera_settings,
+    resolve_stream_source,
+)
+from agent.main import (
+    build_posture_service,
+    ensure_no_proxy,
+    load_settings,
+    resolve_downscale_width,
+)
 from agent.sensors import build_buzzer
 
 
@@ -83,14 +93,20 @@ def main() -> None:
     posture_service = build_posture_service(posture_cfg)
     buzzer = build_buzzer(buzzer_cfg)
 
+    source, api_preference = resolve_stream_source(
+        camera_url, capture_cfg.get("pipeline")
+    )
     stream = CameraStream(
-        source=camera_url,
+        source=source,
+        api_preference=api_preference,
         target_fps=float(capture_cfg.get("target_fps", 15)),
         reconnect_delay=float(capture_cfg.get("reconnect_delay", 5)),
         max_retries=int(capture_cfg.get("max_retries", 3)),
         frame_saver=None,
+        convert_rgb=True,
     )
 
+    downscale_width = resolve_downscale_width(capture_cfg)
     stop = False
 
     def _handle_sigint(_sig: int, _frame: Any) -> None:
@@ -100,12 +116,12 @@ def main() -> None:
 
     signal.signal(signal.SIGINT, _handle_sigint)
 
-    def _on_frame(frame: "Any") -> bool:
+    def _on_frame(_frame: "Any", rgb: "Any") -> bool:
         nonlocal stop
         if stop:
             return False
 
-        assessment = posture_service.analyze(frame)
+        assessment = posture_service.analyze_rgb(downscale_frame(rgb, downscale_width))
         if assessment is None:
             logger.debug("No posture assessment for current frame")
             return True
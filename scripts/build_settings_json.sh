@@ -0,0 +1,35 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+# Regenerate the settings.json sidecar that the agent reads instead of parsing
+# settings.yaml on startup. The agent also refreshes it automatically whenever
+# settings.yaml no longer matches it, so this is only needed to pre-build it
+# (e.g. on deploy).
+
+SCRIPT_DIR="$(cd "$(dirname -- "${BASH_SOURCE[0]}")" && pwd)"
+ROOT_DIR="$(cd "$SCRIPT_DIR/.." && pwd)"
+VENV_DIR="$ROOT_DIR/.venv"
+SETTINGS_PATH="${1:-$ROOT_DIR/config/settings.yaml}"
+
+if [ -d "$VENV_DIR" ]; then
+  source "$VENV_DIR/bin/activate"
+fi
+
+cd "$ROOT_DIR"
+PYTHONPATH="$ROOT_DIR:${PYTHONPATH:-}" python - "$SETTINGS_PATH" <<'PY'
+import sys
+from pathlib import Path
+
+import yaml
+
+from agent.main import settings_sidecar_path, write_settings_sidecar
+
+path = Path(sys.argv[1]).resolve()
+yaml_stat = path.stat()
+with path.open("rb") as handle:
+    settings = yaml.safe_load(handle) or {}
+sidecar = settings_sidecar_path(path)
+if not write_settings_sidecar(sidecar, settings, yaml_stat):
+    sys.exit(f"error: {path} cannot be mirrored to JSON")
+print(f"Wrote {sidecar}")
+PY